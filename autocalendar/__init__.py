@@ -1,14 +1,7 @@
 # Dependencies
-import DateTime
 import datetime
+import importlib
 import platform
-import dateutil
-import pandas as pd
-import numpy as np
-import pickle
-import google_auth_oauthlib
-import google.auth
-import pkg_resources
 
 # Info
 __version__ = "0.1.0"
@@ -49,7 +42,42 @@ Full bibtex reference:
 __citation__ = __cite__
 
 # Import
-from .autocalendar import autoallocate, setup_oath, preprocess_file, extract_info, create_event, add_event
+from .autocalendar import autoallocate, setup_oath, preprocess_file, extract_info, create_event, add_event, add_sessions
+from .allocation import best_allocation, random_allocations, score_allocations
+from .availability import AvailabilityIndex, AvailabilityMatrix, read_poll
+from .matching import match_slots
+from .backends import CalendarBackend, GoogleBackend, ICSBackend, SQLiteBackend, write_ics
+from .calendars import CalendarResolver, resolve_calendar_id
+from .conflicts import BusyIndex, find_conflicts, query_busy
+from .export import export_allocations, write_status
+from .incremental import IncrementalAllocation
+from .ingest import read_participants
+from .instrument import Instrumentation, Recorder, instrument
+from .recurrence import collapse_series, find_series, occurrences, recurrence_rule
+from .submission import TokenBucket, execute_requests, insert_events, submit_events
+from .sync import SyncLedger, event_id, plan_sync, sync_events
+
+# Loaded on first access (see `__getattr__`), as importing the Google client stack is slow
+_lazy_imports = {
+    "CredentialsHolder": ".service",
+    "build_service": ".service",
+    "clear_services": ".service",
+    "get_holder": ".service",
+    "get_service": ".service",
+}
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        value = getattr(importlib.import_module(_lazy_imports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_imports))
+
 
 # =============================================================================
 # Helper functions to retrieve info
@@ -83,18 +111,33 @@ def version(silent=False):
 
     """
     if silent is False:
+        import pickle
+
+        import dateutil
+        import numpy as np
+        import pandas as pd
+
         print(
             "- OS: " + platform.system(),
             "(" + platform.architecture()[1] + " " + platform.architecture()[0] + ")",
             "\n- Python: " + platform.python_version(),
             "\n\n- NumPy: " + np.__version__,
             "\n- Pandas: " + pd.__version__,
-            "\n- datetime: " + pkg_resources.get_distribution("DateTime").version,
+            "\n- datetime: " + _distribution_version("DateTime"),
             "\n- dateutil: " + dateutil.__version__,
             "\n- pickle: " + pickle.format_version,
-            "\n- google-auth-oauthlib: " + pkg_resources.get_distribution("google_auth_oauthlib").version,
-            "\n- google-auth: " + pkg_resources.get_distribution("google_auth_oauthlib").version,
-            "\n- apiclient: " + pkg_resources.get_distribution("google-api-python-client").version,
+            "\n- google-auth-oauthlib: " + _distribution_version("google_auth_oauthlib"),
+            "\n- google-auth: " + _distribution_version("google-auth"),
+            "\n- apiclient: " + _distribution_version("google-api-python-client"),
         )
     else:
         return __version__
+
+
+def _distribution_version(name):
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "not installed"
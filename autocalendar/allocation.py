@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Restarts drawn from each child seed; results do not depend on how blocks are spread over workers
+RESTART_BLOCK = 100
+
+
+# =============================================================================
+# Randomized allocation, vectorized over restarts
+# =============================================================================
+def random_allocations(available, allocate_type='single', rng=None, restarts=1, starts=None, ends=None):
+    """Draw `restarts` random allocations at once.
+
+    Parameters
+    ----------
+    available : np.ndarray
+        Boolean array of shape (n_participants, n_slots).
+    allocate_type : str
+        'single', 'multiple' or 'balanced' (see `autoallocate()`). 'balanced' requires the slots'
+        `starts` and `ends`.
+    rng : np.random.Generator
+        Source of randomness (a new unseeded generator by default).
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (restarts, n_slots) with the index of the participant assigned to each
+        slot, -1 where no one is assigned.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if allocate_type == 'single':
+        return _allocate_single(available, rng, restarts)
+    elif allocate_type == 'multiple':
+        return _allocate_multiple(available, rng, restarts)
+    elif allocate_type == 'balanced':
+        return _allocate_balanced(available, starts, ends, rng, restarts)
+    raise ValueError("`allocate_type` must be 'single', 'multiple' or 'balanced'.")
+
+
+def _allocate_single(available, rng, restarts):
+    """Allocate each slot to a participant who has not been assigned yet (one slot each)."""
+    n_participants, n_slots = available.shape
+    rows = np.arange(restarts)
+    assigned = np.full((restarts, n_slots), -1)
+    taken = np.zeros((restarts, n_participants), dtype=bool)
+
+    for slot in range(n_slots):
+        candidates = np.flatnonzero(available[:, slot])
+        k = len(candidates)
+        if k == 0:
+            continue
+
+        # Up to two random draws among those who chose the slot
+        first = rng.integers(0, k, restarts)
+        chosen = candidates[first]
+        if k > 1:
+            second = rng.integers(0, k - 1, restarts)
+            second += second >= first  # skip the first draw
+            chosen = np.where(taken[rows, chosen], candidates[second], chosen)
+
+        free = ~taken[rows, chosen]
+        assigned[free, slot] = chosen[free]
+        taken[rows[free], chosen[free]] = True
+
+    return assigned
+
+
+def _allocate_multiple(available, rng, restarts):
+    """Allocate every slot someone chose, avoiding the previously assigned participant."""
+    n_slots = available.shape[1]
+    assigned = np.full((restarts, n_slots), -1)
+    last = np.full(restarts, -1)
+
+    for slot in range(n_slots):
+        candidates = np.flatnonzero(available[:, slot])
+        k = len(candidates)
+        if k == 0:
+            continue
+        if k == 1:
+            chosen = np.full(restarts, candidates[0])
+        else:
+            # Draw among the candidates other than the last assigned participant
+            position = np.minimum(np.searchsorted(candidates, last), k - 1)
+            excluded = candidates[position] == last
+            draw = (rng.random(restarts) * (k - excluded)).astype(int)
+            draw += excluded & (draw >= position)
+            chosen = candidates[draw]
+        assigned[:, slot] = last = chosen
+
+    return assigned
+
+
+def _allocate_balanced(available, starts, ends, rng, restarts):
+    """Allocate every slot someone chose without overlapping slots for any participant.
+
+    Slots are swept in order of start time while tracking when each participant becomes free
+    again. Each slot goes to a free candidate with the fewest slots so far (random among ties).
+    """
+    n_participants, n_slots = available.shape
+    starts = np.asarray(starts, dtype='datetime64[ns]').astype('int64')
+    ends = np.asarray(ends, dtype='datetime64[ns]').astype('int64')
+
+    rows = np.arange(restarts)
+    assigned = np.full((restarts, n_slots), -1)
+    free_from = np.full((restarts, n_participants), np.iinfo('int64').min)
+    load = np.zeros((restarts, n_participants), dtype=int)
+
+    for slot in np.argsort(starts, kind='stable'):
+        candidates = np.flatnonzero(available[:, slot])
+        if len(candidates) == 0:
+            continue
+
+        free = free_from[:, candidates] <= starts[slot]
+        loads = np.where(free, load[:, candidates], np.iinfo(int).max)
+        best = free & (loads == loads.min(axis=1, keepdims=True))
+
+        # Random choice among the best candidates of each restart
+        keys = np.where(best, rng.random(best.shape), 2)
+        chosen = candidates[keys.argmin(axis=1)]
+        found = best.any(axis=1)
+
+        assigned[found, slot] = chosen[found]
+        load[rows[found], chosen[found]] += 1
+        free_from[rows[found], chosen[found]] = ends[slot]  # slots are sorted, so this is the latest end
+
+    return assigned
+
+
+# =============================================================================
+# Scoring and restarts
+# =============================================================================
+def score_allocations(assigned, n_participants):
+    """Score allocations of shape (restarts, n_slots) all at once.
+
+    Returns the number of participants allocated ('coverage'), of slots filled ('filled') and
+    the standard deviation of the number of slots per participant ('spread', lower is fairer).
+    """
+    restarts = assigned.shape[0]
+    filled = assigned >= 0
+    offsets = np.repeat(np.arange(restarts) * n_participants, assigned.shape[1]).reshape(assigned.shape)
+    counts = np.bincount((assigned + offsets)[filled], minlength=restarts * n_participants)
+    counts = counts.reshape(restarts, n_participants)
+
+    return {'coverage': (counts > 0).sum(axis=1),
+            'filled': filled.sum(axis=1),
+            'spread': counts.std(axis=1)}
+
+
+def best_allocation(available, allocate_type='single', seed=None, restarts=1, workers=None,
+                    starts=None, ends=None):
+    """Draw `restarts` random allocations and return the best one: most participants allocated,
+    then most slots filled, then the fairest spread of slots across participants.
+
+    With a `seed`, the result is reproducible, whatever the number of `workers` processes the
+    restarts are spread over (all in this process by default).
+    """
+    if restarts < 1:
+        raise ValueError("`restarts` must be at least 1.")
+
+    seeds = np.random.SeedSequence(seed).spawn(-(-restarts // RESTART_BLOCK))
+    blocks = [min(RESTART_BLOCK, restarts - i * RESTART_BLOCK) for i in range(len(seeds))]
+    arguments = [(available, allocate_type, child, block, starts, ends) for child, block in zip(seeds, blocks)]
+
+    if workers is not None and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_best_of_block, *zip(*arguments)))
+    else:
+        results = [_best_of_block(*args) for args in arguments]
+
+    candidates = np.array([assigned for assigned, _ in results])
+    return candidates[_rank(score_allocations(candidates, available.shape[0]))[0]]
+
+
+def _best_of_block(available, allocate_type, seed, restarts, starts, ends):
+    assigned = random_allocations(available, allocate_type, np.random.default_rng(seed), restarts,
+                                  starts=starts, ends=ends)
+    scores = score_allocations(assigned, available.shape[0])
+    best = _rank(scores)[0]
+    return assigned[best], {key: value[best] for key, value in scores.items()}
+
+
+def _rank(scores):
+    """Restarts from best to worst (stable, so ties go to the earliest restart)."""
+    return np.lexsort((scores['spread'], -scores['filled'], -scores['coverage']))
@@ -1,20 +1,36 @@
 # -*- coding: utf-8 -*-
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-
 import pandas as pd
 import numpy as np
-import pickle
-import os.path
+import bisect
 import dateutil.parser
 import calendar
+import functools
+import re
 from datetime import datetime
 
+from .allocation import best_allocation
+from .availability import AvailabilityMatrix, read_poll
+from .backends import GoogleBackend, as_backend
+from .conflicts import event_times, find_conflicts
+from .export import export_allocations, write_status
+from .ingest import read_participants, _sheet_rows
+from .instrument import current, timed
+from .matching import match_slots
+from .recurrence import collapse_series
+from .submission import MAX_BATCH_SIZE
+from .sync import SyncLedger, sync_events
+
+NO_ONE_ASSIGNED = 'No One Assigned'
+
+# Times given in HHMM format, optionally followed by AM/PM
+_HHMM = re.compile(r'^(\d{1,2})(\d{2})(\s*[AaPp][Mm])?$')
+
 # =============================================================================
 # Scheduling tool
 # =============================================================================
-def autoallocate(file, allocate_type='single', filename='', export_to='xlsx'):
+@timed('autoallocate')
+def autoallocate(file, allocate_type='single', filename='', export_to='xlsx', costs=None,
+                 silent=False, seed=None, restarts=1, workers=None):
     """Read and parse a downloaded doode poll (in '.xls' or '.xlsx') where participants are
     able to choose as many timeslots as possible. Automatically allocate participants to a
     slot based on their chosen availabilities. Returns dataframe containing the participants'
@@ -22,18 +38,32 @@ def autoallocate(file, allocate_type='single', filename='', export_to='xlsx'):
 
     Parameters
     ----------
-    file : str
-        Path containing doodle poll file
+    file : str or AvailabilityMatrix
+        Path containing doodle poll file, or a poll already parsed with `read_poll()`.
     allocate_type : str
         The type of allocation. If 'single', allocates one unique slot to each participant. If
-        'multiple', allocates multiple slots to each participant.
-    transpose : bool
-        Exported dataframe will be in long format if True.
+        'multiple', allocates multiple slots to each participant. If 'optimal', allocates one
+        unique slot to each participant using maximum bipartite matching, so that as many
+        participants as possible are allocated (deterministic). If 'balanced', allocates
+        multiple slots to each participant like 'multiple', but never assigns a participant to
+        overlapping slots and spreads slots evenly across participants.
     filename : str
         Name of the file containing the participants' allocations.
     export_to : str
-        Exported file type. Can be 'xlsx' or 'csv'. Can also be set to 'False', which will
-        simply return the dataframe of allocations.
+        Exported file type. Can be 'xlsx', 'csv' or 'parquet' (see `export_allocations()`). Can
+        also be set to 'False', which will simply return the dataframe of allocations.
+    costs : np.ndarray
+        Only used when `allocate_type='optimal'`. Array of shape (n_participants, n_slots) with
+        the cost of each participant-slot pair (lower is preferred). Requires scipy.
+    silent : bool
+        If True, do not print feedback on participants who could not be allocated.
+    seed : int
+        Seed of the random allocation, for reproducible results.
+    restarts : int
+        Number of random allocations to draw (except for 'optimal'). The one allocating the most
+        participants, then filling the most slots, then spreading slots most evenly, is kept.
+    workers : int
+        Number of processes to spread the restarts over (all run in this process by default).
 
     Examples
     --------
@@ -42,108 +72,56 @@ def autoallocate(file, allocate_type='single', filename='', export_to='xlsx'):
     >>> autocalendar.autoallocate(file, allocate_type='multiple', export_to=False)
     """
 
+    collector = current()
+
     # Read and parse doodle poll
-    poll = pd.read_excel(file)
-    poll.loc[2:4,].fillna(method='ffill', axis=1, inplace=True)
-    poll = poll.set_index(poll.columns[0])
-
-    # Extract all possible datetimes
-    datetimes = []
-    dates = []
-    times = []
-    for month, date, time in zip(poll.iloc[2], poll.iloc[3], poll.iloc[4]):
-        exact_date = month + ' ' + date
-        parsed_date = dateutil.parser.parse(exact_date)
-#        day = calendar.day_name[parsed_date.weekday()]
-        dt = parsed_date.strftime("%d/%m/%y") + ', ' + time
-        datetimes.append(dt)
-        dates.append(parsed_date)
-#        days.append(day)
-        times.append(time)
-
-    poll.columns = datetimes
-    poll = poll.iloc[5:]
-
-    # Create empty df for appending assigned dates
-    empty_df = pd.DataFrame(index=['Timeslots', 'Participant'], columns=datetimes)
-    empty_df.iloc[0] = times
-
-    # Allocate slots
-    assignments = []
-
-    # single allocations
-    if allocate_type == 'single':
-        for assigned_date in poll.columns:
-            # Number of subjects who chose the slot
-            n_selections = poll[assigned_date].astype(str).str.contains('OK').sum()
-
-            if n_selections == 0:
-                empty_df[assigned_date].Participant = 'No One Assigned'
-
-            elif n_selections == 1:
-                single_name = poll[poll[assigned_date] == 'OK'].index.values[0]
-                if single_name not in assignments:
-                    # If subject has not been assigned yet
-                    empty_df[assigned_date].Participant = single_name
-                    assignments.append(single_name)
-                else:
-                    empty_df[assigned_date].Participant = 'No One Assigned'
-
-            elif n_selections > 1:
-                multiple_names = poll[poll[assigned_date] == 'OK'].index.values
-                chosen_name = np.random.choice(multiple_names)
-                if chosen_name not in assignments:
-                    empty_df[assigned_date].Participant = chosen_name
-                    assignments.append(chosen_name)
-                else:
-                    chosen_name_2 = np.random.choice(multiple_names[multiple_names != chosen_name])
-                    if chosen_name_2 not in assignments:
-                        empty_df[assigned_date].Participant = chosen_name_2
-                        assignments.append(chosen_name_2)
-                    else:
-                        empty_df[assigned_date].Participant = 'No One Assigned'
-
-    # multiple allocations
-    elif allocate_type == 'multiple':
-        for assigned_date in poll.columns:
-            n_selections = poll[assigned_date].astype(str).str.contains('OK').sum()
-
-            if n_selections == 0:
-                empty_df[assigned_date].Participant = 'No One Assigned'
-            elif n_selections == 1:
-                single_name = poll[poll[assigned_date] == 'OK'].index.values[0]
-                empty_df[assigned_date].Participant = single_name
-                assignments.append(single_name)
-            elif n_selections > 1:
-                multiple_names = poll[poll[assigned_date] == 'OK'].index.values
-                chosen_name = np.random.choice(multiple_names[multiple_names != max(enumerate(assignments))[1]])
-                empty_df[assigned_date].Participant = chosen_name
-                assignments.append(chosen_name)
+    with collector.stage('autoallocate.parse') as stage:
+        if isinstance(file, AvailabilityMatrix):
+            matrix = file
+        else:
+            matrix = read_poll(file)
+        stage.count(participants=matrix.n_participants, slots=matrix.n_slots)
+
+    # Allocate slots (index of the assigned participant for each slot, -1 if none)
+    with collector.stage('autoallocate.allocate'):
+        if allocate_type == 'optimal':
+            assigned = match_slots(matrix.available, costs=costs)
+        elif allocate_type in ('single', 'multiple', 'balanced'):
+            assigned = best_allocation(matrix.available, allocate_type, seed=seed, restarts=restarts,
+                                       workers=workers, starts=matrix.slots['Start'],
+                                       ends=matrix.slots['End'])
+        else:
+            raise ValueError("`allocate_type` must be 'single', 'multiple', 'optimal' or 'balanced'.")
+
+    allocated = np.zeros(matrix.n_participants, dtype=bool)
+    allocated[assigned[assigned >= 0]] = True
+    collector.note('unallocated', matrix.participants[~allocated].tolist())
 
     # prepare output
-    allocations = empty_df.copy()
-    allocations.columns = allocations.columns.str.split(', ').str[0]  # Only dates as header row
-
-    allocations = pd.DataFrame.transpose(allocations)
-    allocations = allocations.rename(columns={allocations.columns[0]: 'Timeslots' })
-    allocations.index.names = ['Date']
-    allocations = allocations.reset_index(level='Date')
-
-    # Export
-    if export_to == 'csv':
-        allocations.to_csv(filename + '.csv', index=False)
-    elif export_to == 'xlsx':
-        allocations.to_excel(filename + '.xlsx', index=False)
-    elif export_to is False:
-        return allocations
+    with collector.stage('autoallocate.export'):
+        allocations = _allocation_frame(matrix, assigned)
+
+        # Export
+        if export_to is not False:
+            export_allocations(allocations, filename, export_to)
 
     # Feedback
-    participants = poll.index[poll.index != 'Count'].tolist()
-    for participant in participants:
-        if participant not in assignments:
+    if not silent:
+        for participant in matrix.participants[~allocated]:
             print(f'{participant}' + ' could not be allocated.')
-    if len(np.intersect1d(participants, assignments)) == len(participants):
-        print('All participants successfully allocated.')
+        if allocated.all():
+            print('All participants successfully allocated.')
+
+    if export_to is False:
+        return allocations
+
+
+def _allocation_frame(matrix, assigned):
+    """Dataframe of 'Date', 'Timeslots' and 'Participant' for each slot of the poll."""
+    participants = np.append(matrix.participants, NO_ONE_ASSIGNED)  # index -1 for empty slots
+    return pd.DataFrame({'Date': matrix.slots['Date'].dt.strftime("%d/%m/%y").to_numpy(),
+                         'Timeslots': matrix.slots['Timeslots'].to_numpy(),
+                         'Participant': participants[assigned]})
 
 
 
@@ -151,33 +129,24 @@ def autoallocate(file, allocate_type='single', filename='', export_to='xlsx'):
 # Initialize Google API Console Credentials
 # =============================================================================
 
-def setup_oath(token_path, client_path):
+@timed('setup_oath')
+def setup_oath(token_path, client_path, reuse=True, discovery_path=None):
     """
     Path containing token.pkl and client_secret.json respectively.
-    """
-    # Set up credentials
-    scopes = ['https://www.googleapis.com/auth/calendar']
-
-    # Token generated after first time code is run.
-    if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            credentials = pickle.load(token)
-    else:
-        credentials = None
 
-    # If there are no (valid) credentials available, log in and enter authorization code manually
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(client_path, scopes=scopes)
-            credentials = flow.run_local_server(port=0)
+    With `reuse` (default), the Calendar resource is built once per process and returned again
+    on later calls, with its credentials refreshed shortly before they expire. The discovery
+    document is read from `discovery_path` if given, or else from googleapiclient's local copy,
+    so no network fetch is needed.
+    """
+    # Imported here as the Google client stack is slow to import
+    from .service import build_service, get_service, load_credentials
 
-       # Save the credentials for the next run
-        with open(token_path, 'wb') as token:
-            pickle.dump(credentials, token)
+    if reuse:
+        return get_service(token_path, client_path, discovery_path=discovery_path)
 
-    service = build("calendar", "v3", credentials=credentials)
+    credentials = load_credentials(token_path, client_path)
+    service = build_service(credentials, discovery_path=discovery_path)
 
     return service
 
@@ -186,22 +155,39 @@ def setup_oath(token_path, client_path):
 # =============================================================================
 
 
-def preprocess_file(file, header_row=1):
+@timed('preprocess_file')
+def preprocess_file(file, header_row=1, usecols=None, filter_column=None, select=None):
     """Tidy excel sheet containing participants' particulars.
 
     If there are multiple header rows, denote the header row to be selected in `header_row` (defaults to 1). For example, `header_row=2` specifies the second row as the main column names of interest, which will be needed in `extract_info()`.
+
+    To ingest large sheets, set `usecols` to the columns needed by `extract_info()` and/or
+    `filter_column` and `select` to keep only some participants (as in `extract_info()`). The
+    file is then streamed and only the selected columns and rows are kept in memory. In this
+    mode, '.csv' and '.parquet' files are also accepted.
+
+    Participants are indexed by their (1-based) 'Row' in the sheet, which `add_event()` uses to
+    mark the rows whose events were added (see `status_file`).
     """
 
+    if usecols is not None or filter_column is not None:
+        participants = read_participants(file, header_row=header_row, usecols=usecols,
+                                         filter_column=filter_column, select=select)
+        current().count('preprocess_file', rows=len(participants))
+        return participants
+
     participants = pd.read_excel(file)
     print('Parsing information... Please wait as this can take a while.')
 
     if header_row > 1:
         participants.columns = participants.iloc[header_row-2]
-        participants = participants.reindex(participants.index.drop(0)).reset_index(drop=True)
+        participants = participants.reindex(participants.index.drop(0))
 
-    return participants
+    current().count('preprocess_file', rows=len(participants))
+    return _sheet_rows(participants)  # read below the first row
 
 
+@timed('extract_info')
 def extract_info(participants, date_col, time_col, location_col=None, starttime_col=None, endtime_col=None,
                  filter_column=None, select=None):
     """Extract date, time, and location of event based on header column names in the
@@ -225,9 +211,12 @@ def extract_info(participants, date_col, time_col, location_col=None, starttime_
         to_add = participants[participants[filter_column] == select]
     else:
         to_add = participants
+    current().count('extract_info', rows=len(to_add))
 
     # Format date
-    dates = np.array(to_add[date_col])
+    if not pd.api.types.is_datetime64_any_dtype(to_add[date_col]):  # e.g. text dates from '.csv' sheets
+        to_add = to_add.assign(**{date_col: _parse_dates(to_add[date_col])})
+    dates = _to_dates(to_add[date_col])
 #    dates_list = np.array([])
 #    for i in dates:
 #        if isinstance(i, str):  # convert to datetime obj
@@ -239,36 +228,11 @@ def extract_info(participants, date_col, time_col, location_col=None, starttime_
         location = np.array(to_add[location_col])
 
     # Format time
-    start_points = np.array([])
-    end_points = np.array([])
-
     if not starttime_col and not endtime_col:
-        timing = np.array(to_add[time_col])
-        timings = np.array([])
-
-        # Formatting: detect time with colon
-        for t in timing:
-            if '.' in t:
-                t_new = t.replace('.', ':')
-                timings = np.append(timings, t_new)
-            else:
-                timings = timing
-
-        for i in timings:
-            if ' ' in i:  # split time entry based on space ' '
-                start = dateutil.parser.parse(i.split(' ')[0]).time()
-                end = dateutil.parser.parse(i.split(' ')[2]).time()
-            elif '-' in i:  # split time entry into start and end time based on '-'
-                start = dateutil.parser.parse(i.split('-')[0]).time()
-                end = dateutil.parser.parse(i.split('-')[1]).time()
-            start_points = np.append(start_points, start)
-            end_points = np.append(end_points, end)
-
+        start_points, end_points = _parse_timeslots(to_add[time_col])
     else:
-        starttime_col = [start.replace('.', ':') for start in starttime_col]
-        start_points = np.append(start_points, starttime_col)
-        endtime_col = [end.replace('.', ':') for end in endtime_col]
-        end_points = np.append(end_points, endtime_col)
+        start_points = _parse_times(to_add[starttime_col].astype(str).to_numpy())
+        end_points = _parse_times(to_add[endtime_col].astype(str).to_numpy())
 
     if location_col:
         return dates, start_points, end_points, location, to_add
@@ -276,12 +240,59 @@ def extract_info(participants, date_col, time_col, location_col=None, starttime_
         return dates, start_points, end_points, to_add
 
 
+def _to_dates(column):
+    if not pd.api.types.is_datetime64_any_dtype(column):
+        column = _parse_dates(column)
+    return column.dt.to_pydatetime()
+
+
+def _parse_dates(column):
+    """Parse a column of dates that are text (in 'DD/MM/YY' format, as in '.csv' sheets) or a
+    mix of text and datetime objects (e.g. excel cells not formatted as dates)."""
+    return pd.to_datetime(pd.Series(column), dayfirst=True)
+
+
+def _parse_timeslots(timeslots):
+    """Split timeslot entries such as '10.00am-12.00pm' into arrays of start and end
+    `datetime.time`. The work is done on the distinct entries only, then expanded back to all rows.
+    """
+    codes, timings = pd.factorize(pd.Series(timeslots).astype(str))
+
+    # Formatting: detect time with colon
+    timings = pd.Series(timings, dtype=object).str.replace('.', ':', regex=False)
+
+    # split time entry based on space ' ' (e.g. '10:00am - 12:00pm'), else on '-'
+    has_space = timings.str.contains(' ', regex=False).to_numpy()
+    starts = np.where(has_space, timings.str.split(' ').str[0], timings.str.split('-').str[0])
+    ends = np.where(has_space, timings.str.split(' ').str[2], timings.str.split('-').str[1])
+
+    return _parse_times(starts)[codes], _parse_times(ends)[codes]
+
+
+def _parse_times(texts):
+    """Parse an array of time strings into an object array of `datetime.time`, parsing each
+    distinct string only once.
+    """
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object))
+    parsed = np.array([_parse_time(text) for text in uniques] + [None], dtype=object)
+    return parsed[codes]  # code -1 (missing) maps to None
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_time(text):
+    text = text.strip().replace('.', ':')
+    text = _HHMM.sub(r'\1:\2\3', text)  # e.g. '1430' -> '14:30'
+    return dateutil.parser.parse(text).time()
+
+
 def create_event(event_name, description, date, start, end, location, timezone, creator_email,
-                 calendar_id='primary'):
+                 calendar_id='primary', recurrence=None):
     """Create event in terms of Google Calendar API.
 
     See also https://developers.google.com/calendar/v3/reference/events
 
+    To repeat the event, set `recurrence` to its RRULE and EXDATE lines, e.g.,
+    `recurrence_rule(interval=7, count=6)` for six weekly sessions.
     """
 
     event = {
@@ -306,6 +317,8 @@ def create_event(event_name, description, date, start, end, location, timezone,
         ],
       },
     }
+    if recurrence is not None:
+        event['recurrence'] = list(recurrence)
 
     return event, calendar_id
 
@@ -314,16 +327,65 @@ def create_event(event_name, description, date, start, end, location, timezone,
 # Execution
 # =============================================================================
 
+@timed('add_event')
 def add_event(service, dates, start_points, end_points, locations, to_add,
               creator_email, event_name='Experiment', description='',
               timezone='Asia/Singapore', calendar_id='primary', silent=False,
               name_col=None, date_col=None, time_col=None, location_col=None,
-              starttime_col=None, endtime_col=None):
+              starttime_col=None, endtime_col=None, batch_size=None, workers=None, qps=10,
+              resolver=None, ledger=None, on_conflict=None, reroute_to=None,
+              status_file=None, status_col='Calendar_Event', header_row=1, recurring=False,
+              delete_missing=False):
     """Execute adding of event into google calendar. Set `service` as the resource built from the
-    googleapiclient, e.g., service = autocalendar.setup_oath()
+    googleapiclient, e.g., service = autocalendar.setup_oath(), or as a `CalendarBackend`, e.g.
+    `SQLiteBackend` or `ICSBackend` to plan events locally without calling the API (in which
+    case `batch_size`, `workers`, `qps` and `resolver` are those of the backend).
 
     If silent is set to True, print feedback of information that is added, columns to be denoted by
     `*_col` (Otherwise set to None).
+
+    If `batch_size` is set (up to 50), events are inserted through Calendar API batch requests
+    of that size instead of one request per event. A failing event then does not abort the
+    import: the per-event results of `insert_events()` are returned, and failures are printed
+    unless `silent` is True.
+
+    If `workers` is set, events are submitted concurrently by that many threads with
+    `submit_events()`, throttled to `qps` queries per second and retried with exponential backoff
+    on rate-limit and server errors (each request carrying `batch_size` inserts, one if unset).
+
+    Calendar names are resolved to IDs with `resolver` (a `CalendarResolver`), by default an
+    in-memory resolver shared by all calls, so the calendar list is only fetched once per session.
+
+    If `ledger` (a `SyncLedger` or the path of its SQLite file) is given, events are synced
+    incrementally with `sync_events()`, keyed by the participants in `name_col` and by
+    `event_name`: only new or changed rows are inserted or patched, so re-running on the same
+    sheet does not create duplicates. Calls are sent in batch requests of `batch_size` (50 by
+    default) or, if `workers` is set, concurrently within `qps`, as without a ledger. The number
+    of inserted, patched, deleted, unchanged and failed events is returned. With `delete_missing=True`, events of `event_name` whose participant is
+    no longer in `to_add` are also deleted. Only set it when `to_add` holds the full sheet: rows
+    left out by `filter_column`/`select` in `extract_info()` (e.g. participants already marked
+    'Yes') or skipped by `on_conflict` would otherwise have their events deleted.
+
+    If `on_conflict` is set, events are first checked against the calendar's busy times with
+    `find_conflicts()` (a few free/busy queries for the whole import). Conflicts are printed
+    (unless `silent`) and, with 'report', inserted anyway; with 'skip', they are not inserted;
+    with 'reroute', each is moved to the first calendar in `reroute_to` (calendar names) that
+    is free at that time, or skipped if none is. Calendars whose busy times cannot be read are
+    never rerouted to; if those of `calendar_id` cannot be read, a ValueError is raised.
+    Results are still returned for every row of `to_add`, skipped events with the result
+    {'id': None, 'error': 'conflict'}.
+
+    If `status_file` (the participants sheet the events were read from) is given, `status_col`
+    is set to 'Yes' and the created event IDs are written to a 'Calendar_Event_ID' column for
+    the rows whose events were added, in one pass with `write_status()`. Rows are matched by
+    their sheet 'Row' if `to_add` comes from `preprocess_file()` (so each session row gets its
+    own status and ID), and otherwise by the participants in `name_col`. `header_row` is the
+    header row of the sheet, as in `preprocess_file()`.
+
+    If `recurring` is True, the sessions of each participant in `name_col` (one row per
+    session) that repeat at a regular interval at the same time are sent as one recurring
+    event, with exceptions for missing sessions (see `collapse_series()`), i.e., one insert per
+    series instead of one per session. Results are still returned per row.
     """
 
     events = []
@@ -347,30 +409,320 @@ def add_event(service, dates, start_points, end_points, locations, to_add,
 
     # If 'calendar_id' in `create_event` is set to primary, then use primary calendar, if not
     # input the string of the calendar name that you intend to use.
-    result = service.calendarList().list().execute()
-    if calendar_id != 'primary':
-        choose = []
-        for dictionary in result['items']:
-            if dictionary['summary'] == calendar_id:
-                choose.append(dictionary['id'])
-        calendar_id = choose[0]
+    collector = current()
+    collector.count('add_event', events=len(events))
+    backend = as_backend(service, resolver=resolver, batch_size=batch_size, workers=workers, qps=qps)
+    with collector.stage('add_event.resolve_calendar'):
+        calendar_id = backend.calendar_id(calendar_id)
+
+    # Check for conflicts
+    keep = None
+    if on_conflict is not None:
+        with collector.stage('add_event.conflicts'):
+            events, calendar_id, keep = _resolve_conflicts(backend, events, calendar_id, to_add,
+                                                           on_conflict, reroute_to, timezone,
+                                                           name_col, silent)
+        if ledger is not None and not isinstance(calendar_id, str):
+            raise ValueError("Events rerouted to other calendars cannot be synced with a `ledger`.")
+
+    kept = to_add[keep] if keep is not None else to_add  # rows of the events to submit
+
+    # Collapse repeated sessions into recurring events
+    covered = None
+    if recurring:
+        if ledger is not None:
+            raise ValueError("Recurring events cannot be synced with a `ledger`.")
+        with collector.stage('add_event.recurring'):
+            n_rows = len(events)
+            events, calendar_id, covered = collapse_series(
+                events, calendar_id, keys=kept[name_col] if name_col else None)
+            collector.count('add_event.recurring', rows=n_rows, events=len(events))
 
     # Execute
-    if len(to_add) > 1:
-        for i in events:
-            service.events().insert(calendarId=calendar_id, body=i).execute()
-    else:
-        service.events().insert(calendarId=calendar_id, body=event).execute()
+    results = None
+    event_ids = None
+    with collector.stage('add_event.submit'):
+        if ledger is not None:
+            if name_col is None:
+                raise ValueError("`name_col` is required to sync events with a `ledger`.")
+            if not isinstance(backend, GoogleBackend):
+                raise ValueError("Events can only be synced with a `ledger` to google calendar.")
+            summary = sync_events(backend.service, events, keys=kept[name_col], ledger=ledger,
+                                  calendar_id=calendar_id, session=event_name,
+                                  delete_missing=delete_missing,
+                                  batch_size=backend.batch_size or MAX_BATCH_SIZE,
+                                  workers=backend.workers, qps=backend.qps)
+        elif workers is not None or batch_size is not None or backend is service:
+            results = backend.insert_many(events, calendar_id=calendar_id)
+        else:
+            event_ids = []
+            for i, body in enumerate(events):
+                calendar = calendar_id if isinstance(calendar_id, str) else calendar_id[i]
+                event_ids.append(backend.insert(body, calendar))
+
+    if covered is not None:  # back to one result per row
+        results = [dict(results[j]) for j in covered] if results is not None else None
+        event_ids = [event_ids[j] for j in covered] if event_ids is not None else None
+
+    if keep is not None:  # back to one result per row of `to_add`, skipped rows included
+        skipped = {'id': None, 'error': 'conflict'}
+        if results:
+            skipped.update({name: 0 for name in results[0] if name not in skipped})  # e.g. 'retries'
+        if results is not None:
+            submitted = iter(results)
+            results = [next(submitted) if kept_row else dict(skipped) for kept_row in keep]
+        if event_ids is not None:
+            submitted = iter(event_ids)
+            event_ids = [next(submitted) if kept_row else None for kept_row in keep]
+
+    # Write back which rows were added
+    if status_file is not None:
+        if name_col is None:
+            raise ValueError("`name_col` is required to write back to `status_file`.")
+        with collector.stage('add_event.write_status'):
+            added, ids = _added_events(to_add[name_col], results, event_ids, ledger, calendar_id,
+                                       event_name)
+            rows = to_add.index[added] if to_add.index.name == 'Row' else None
+            write_status(status_file, to_add[name_col].iloc[added], ids, name_col=name_col,
+                         status_col=status_col, header_row=header_row, rows=rows)
+
+    if ledger is not None:
+        collector.note('synced', summary)
+        if not silent:
+            print('Synced calendar events: ' + ', '.join(f'{count} {status}' for status, count in summary.items()))
+        return summary
+
+    if name_col is not None:
+        collector.note('added', [name for i, name in enumerate(to_add[name_col])
+                                 if results[i]['error'] is None] if results is not None
+                       else kept[name_col].tolist())
 
     # Print output
     if not silent:
-        for name in to_add[name_col]:
-            info_date = to_add[date_col][to_add[name_col] == name].iloc[0].date().strftime("%d-%m-%Y")
+        for name in kept[name_col]:
+            info_date = kept[date_col][kept[name_col] == name].iloc[0].date().strftime("%d-%m-%Y")
             if not starttime_col and not endtime_col:
-                info_time = to_add[time_col][to_add[name_col] == name].iloc[0]
+                info_time = kept[time_col][kept[name_col] == name].iloc[0]
             else:
-                info_time = to_add[starttime_col][to_add[name_col] == name].iloc[0] + ' - ' + to_add[endtime_col][to_add[name_col] == name].iloc[0]
-            info_location = to_add[location_col][to_add[name_col] == name].iloc[0]
+                info_time = kept[starttime_col][kept[name_col] == name].iloc[0] + ' - ' + kept[endtime_col][kept[name_col] == name].iloc[0]
+            info_location = kept[location_col][kept[name_col] == name].iloc[0]
 
             print('Adding calendar event for ' + f'{name} ' + 'at ' + f'{info_date}, '
                   + f'{info_time}, ' + f'{info_location} ')
+
+    if results is not None:
+        if not silent:
+            names = to_add[name_col] if name_col else range(len(results))
+            for name, result in zip(names, results):
+                if result['error'] not in (None, 'conflict'):  # conflicts were printed when checked
+                    print('Could not add calendar event for ' + f'{name}: ' + f"{result['error']}")
+        return results
+
+
+def _added_events(names, results, event_ids, ledger, calendar_id, session):
+    """Positions (in `names`) and event IDs of the rows whose events were added, from the
+    per-event `results`, the sequential `event_ids` or the sync `ledger`.
+    """
+    names = list(names)
+    if ledger is not None:
+        if isinstance(ledger, SyncLedger):
+            entries = ledger.entries(calendar_id, session)
+        else:
+            with SyncLedger(ledger) as opened:
+                entries = opened.entries(calendar_id, session)
+        added = [i for i, name in enumerate(names) if str(name) in entries]
+        return added, [entries[str(names[i])][0] for i in added]
+    if results is not None:
+        added = [i for i, result in enumerate(results) if result['error'] is None]
+        return added, [results[i]['id'] for i in added]
+    added = [i for i, event_id in enumerate(event_ids) if event_id is not None]  # None if skipped
+    return added, [event_ids[i] for i in added]
+
+
+def _resolve_conflicts(backend, events, calendar_id, to_add, on_conflict, reroute_to, timezone,
+                       name_col, silent):
+    """Check events against busy times and apply `on_conflict` ('report', 'skip' or 'reroute').
+    Returns the events and calendar ID(s) to add, and whether each row of `to_add` is kept.
+    """
+    if on_conflict not in ('report', 'skip', 'reroute'):
+        raise ValueError("`on_conflict` must be 'report', 'skip' or 'reroute'.")
+    if not events:
+        return events, calendar_id, np.ones(0, dtype=bool)
+
+    alternatives = {}  # ID: name
+    if on_conflict == 'reroute':
+        alternatives = {backend.calendar_id(name): name for name in reroute_to or []}
+
+    # One set of free/busy queries for the target and alternative calendars
+    starts = event_times(events, 'start', timezone)
+    ends = event_times(events, 'end', timezone)
+    busy = backend.busy([calendar_id, *alternatives], starts.min(), ends.max())
+    report = find_conflicts(backend, events, calendar_id=calendar_id, timezone=timezone, busy=busy)
+
+    # Never reroute to calendars whose busy times are unknown
+    for alternative in [alternative for alternative in alternatives if alternative in busy.errors]:
+        if not silent:
+            print(f'Could not read the busy times of {alternatives[alternative]} '
+                  f"({', '.join(map(str, busy.errors[alternative]))}), not rerouting to it")
+        del alternatives[alternative]
+
+    names = to_add[name_col].tolist() if name_col else list(range(len(events)))
+    current().note('conflicts', [names[i] for i in np.flatnonzero(report['Conflict'])])
+    calendars = [calendar_id] * len(events)
+    keep = np.ones(len(events), dtype=bool)
+
+    conflicts = np.flatnonzero(report['Conflict'])
+    # Whether each alternative calendar is free for each conflicting event, checked all at once
+    free = {alternative: ~busy.overlaps(alternative, starts.iloc[conflicts], ends.iloc[conflicts])[0]
+            for alternative in alternatives}
+    conflict_starts = starts.iloc[conflicts].to_numpy(dtype='int64')
+    conflict_ends = ends.iloc[conflicts].to_numpy(dtype='int64')
+    rerouted = {alternative: ([], []) for alternative in alternatives}  # sorted starts and ends moved there
+
+    for n, i in enumerate(conflicts):
+        if on_conflict == 'reroute':
+            start, end = conflict_starts[n], conflict_ends[n]
+            for alternative in alternatives:
+                # Events moved to an alternative never overlap, so their ends are sorted too
+                moved_starts, moved_ends = rerouted[alternative]
+                position = bisect.bisect_left(moved_starts, start)
+                if free[alternative][n] and (position == 0 or moved_ends[position - 1] <= start) \
+                        and (position == len(moved_starts) or moved_starts[position] >= end):
+                    calendars[i] = alternative
+                    moved_starts.insert(position, start)
+                    moved_ends.insert(position, end)
+                    break
+        if on_conflict == 'skip' or (on_conflict == 'reroute' and calendars[i] == calendar_id):
+            keep[i] = False
+
+        if not silent:
+            action = {'report': 'adding anyway', 'skip': 'skipped'}.get(
+                on_conflict, 'rerouted to ' + alternatives.get(calendars[i], '') if keep[i] else 'skipped')
+            info_date = report['Start'].iloc[i].tz_convert(timezone).strftime("%d-%m-%Y, %H:%M")
+            print('Conflict for ' + f'{names[i]} ' + 'at ' + f'{info_date} ' + f'({action})')
+
+    events = [event for event, kept in zip(events, keep) if kept]
+    calendars = [calendar for calendar, kept in zip(calendars, keep) if kept]
+    if len(set(calendars)) <= 1:
+        calendars = calendars[0] if calendars else calendar_id
+    return events, calendars, keep
+
+
+@timed('add_sessions')
+def add_sessions(service, participants, sessions, creator_email, name_col='Participant Name',
+                 filter_column=None, select=None, timezone='Asia/Singapore', silent=False,
+                 batch_size=50, workers=None, qps=10, resolver=None):
+    """Add the events of several sessions into google calendar in a single pass.
+
+    The participants sheet is filtered once, the times of all sessions are parsed together,
+    each calendar is resolved once and all events are submitted together (in batch requests of
+    `batch_size`, or concurrently if `workers` is set, see `add_event()`).
+
+    Parameters
+    ----------
+    service : Resource
+        The resource built from the googleapiclient, e.g., service = autocalendar.setup_oath(),
+        or a `CalendarBackend` (see `add_event()`).
+    participants : pd.DataFrame
+        Participants' particulars, e.g. from `preprocess_file()`.
+    sessions : list
+        One dictionary per session with the keys 'date_col' and either 'time_col' or
+        'starttime_col' and 'endtime_col' (see `extract_info()`), and optionally 'location_col',
+        'event_name', 'description' and 'calendar_id' (name of the calendar, 'primary' by
+        default). Participants without a date for a session are skipped for that session.
+    name_col : str
+        Column with the participants' names.
+    filter_column, select : str
+        Only add participants whose `filter_column` equals `select` (see `extract_info()`).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per event with the participant, 'Session', 'Calendar', 'Date', 'Start', 'End',
+        'Location', the created 'Event ID' and the 'Error', if any.
+
+    Examples
+    --------
+    >>> sessions = [{'date_col': 'Date_Session1', 'time_col': 'Timeslot_Session1',
+    ...              'location_col': 'Location_Session1', 'event_name': 'Experiment Session 1',
+    ...              'calendar_id': 'Lab Use (NTU)'},
+    ...             {'date_col': 'Date_Session2', 'time_col': 'Timeslot_Session2',
+    ...              'location_col': 'Location_Session2', 'event_name': 'fMRI study Session 2',
+    ...              'calendar_id': 'Lab Use (NTU)'}]
+    >>> autocalendar.add_sessions(service, participants, sessions, creator_email='lauzenjuen@gmail.com',
+    ...                           filter_column='Calendar_Event', select='No')
+    """
+    collector = current()
+
+    if filter_column is not None and select is not None:
+        to_add = participants[participants[filter_column] == select]
+    else:
+        to_add = participants
+
+    # Gather all sessions into one table
+    frames = []
+    for session in sessions:
+        rows = to_add[to_add[session['date_col']].notna()]
+        frame = pd.DataFrame({name_col: rows[name_col].to_numpy(),
+                              'Session': session.get('event_name', 'Experiment'),
+                              'Description': session.get('description', ''),
+                              'Calendar': session.get('calendar_id', 'primary'),
+                              'Date': _to_dates(rows[session['date_col']])})
+        if session.get('starttime_col') and session.get('endtime_col'):
+            frame['Start'] = rows[session['starttime_col']].astype(str).to_numpy()
+            frame['End'] = rows[session['endtime_col']].astype(str).to_numpy()
+        else:
+            frame['Timeslot'] = rows[session['time_col']].to_numpy()
+        location_col = session.get('location_col')
+        frame['Location'] = rows[location_col].to_numpy() if location_col else None
+        frames.append(frame)
+    plan = pd.concat(frames, ignore_index=True)
+    collector.count('add_sessions', rows=len(to_add), events=len(plan))
+
+    # Parse the times of all sessions together
+    if 'Timeslot' not in plan:
+        plan['Timeslot'] = None
+    timeslots = plan['Timeslot'].notna().to_numpy()
+    start_points = np.empty(len(plan), dtype=object)
+    end_points = np.empty(len(plan), dtype=object)
+    start_points[timeslots], end_points[timeslots] = _parse_timeslots(plan['Timeslot'][timeslots])
+    if not timeslots.all():
+        start_points[~timeslots] = _parse_times(plan['Start'][~timeslots].to_numpy())
+        end_points[~timeslots] = _parse_times(plan['End'][~timeslots].to_numpy())
+    plan['Start'] = start_points
+    plan['End'] = end_points
+
+    # Resolve every calendar once
+    backend = as_backend(service, resolver=resolver, batch_size=batch_size, workers=workers, qps=qps)
+    with collector.stage('add_sessions.resolve_calendar'):
+        calendar_ids = {name: backend.calendar_id(name) for name in plan['Calendar'].unique()}
+
+    events = [create_event(event_name=session, description=description, date=date, start=start,
+                           end=end, location=location, timezone=timezone,
+                           creator_email=creator_email)[0]
+              for session, description, date, start, end, location
+              in zip(plan['Session'], plan['Description'], plan['Date'], plan['Start'],
+                     plan['End'], plan['Location'])]
+    event_calendars = plan['Calendar'].map(calendar_ids).tolist()
+
+    # Submit all events through one pipeline
+    with collector.stage('add_sessions.submit'):
+        results = backend.insert_many(events, calendar_id=event_calendars)
+
+    report = plan[[name_col, 'Session', 'Calendar', 'Date', 'Start', 'End', 'Location']].copy()
+    report['Event ID'] = [result['id'] for result in results]
+    report['Error'] = [result['error'] for result in results]
+    collector.note('added', report.loc[report['Error'].isna(), name_col].tolist())
+
+    # Print output
+    if not silent:
+        for row in report.itertuples(index=False):
+            name, session, _, date, start, end, location, _, error = row
+            info_time = start.strftime("%H:%M") + ' - ' + end.strftime("%H:%M")
+            if error is None:
+                print('Adding calendar event for ' + f'{name} ' + f'({session}) ' + 'at '
+                      + f'{date.strftime("%d-%m-%Y")}, ' + f'{info_time}, ' + f'{location} ')
+            else:
+                print('Could not add calendar event for ' + f'{name} ' + f'({session}): ' + f'{error}')
+
+    return report
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+import re
+from datetime import datetime, timedelta
+
+import dateutil.parser
+import numpy as np
+import pandas as pd
+
+# Layout of a doodle poll export (row positions when read without a header)
+MONTH_ROW = 3
+DATE_ROW = 4
+TIME_ROW = 5
+FIRST_PARTICIPANT_ROW = 6
+
+_SLOT_SEPARATOR = re.compile(r'\s*[–—-]\s*')
+
+
+# =============================================================================
+# Availability matrix
+# =============================================================================
+class AvailabilityMatrix:
+    """Participant × slot availability parsed from a doodle poll.
+
+    `available` is a boolean array of shape (n_participants, n_slots) where `True` means the
+    participant ticked 'OK' for that slot. `slots` is a dataframe indexed by slot position with
+    the columns 'Date', 'Timeslots', 'Start' and 'End'.
+
+    Examples
+    --------
+    >>> import autocalendar
+    >>> matrix = autocalendar.read_poll('doodle_poll.xls')
+    >>> matrix.participants[matrix.available[:, 0]]  # who chose the first slot
+    """
+
+    def __init__(self, participants, slots, available):
+        self.participants = np.asarray(participants, dtype=object)
+        self.slots = slots.reset_index(drop=True)
+        self.available = np.asarray(available, dtype=bool)
+
+        if self.available.shape != (len(self.participants), len(self.slots)):
+            raise ValueError("`available` must have shape (n_participants, n_slots).")
+
+    def __repr__(self):
+        return f'AvailabilityMatrix({self.n_participants} participants × {self.n_slots} slots)'
+
+    @property
+    def n_participants(self):
+        return len(self.participants)
+
+    @property
+    def n_slots(self):
+        return len(self.slots)
+
+    @property
+    def counts(self):
+        """Number of participants available for each slot."""
+        return self.available.sum(axis=0)
+
+    @property
+    def labels(self):
+        """Slot labels in the 'DD/MM/YY, timeslot' form used by the poll."""
+        return (self.slots['Date'].dt.strftime("%d/%m/%y") + ', ' + self.slots['Timeslots']).to_numpy()
+
+    def packed(self):
+        """Bit-packed availability (participants × ceil(n_slots / 8)) as uint8."""
+        return np.packbits(self.available, axis=1)
+
+    @classmethod
+    def from_packed(cls, participants, slots, packed):
+        """Rebuild a matrix from the output of `packed()`."""
+        available = np.unpackbits(packed, axis=1, count=len(slots)).astype(bool)
+        return cls(participants, slots, available)
+
+    def candidates(self, slot):
+        """Indices of the participants available for `slot`."""
+        return np.flatnonzero(self.available[:, slot])
+
+    def to_frame(self):
+        """Availability as a boolean dataframe (participants as rows, slot labels as columns)."""
+        return pd.DataFrame(self.available, index=self.participants, columns=self.labels)
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+def read_poll(file, ok='OK'):
+    """Read a downloaded doodle poll (in '.xls' or '.xlsx') into an `AvailabilityMatrix`.
+
+    The sheet is parsed once: month, date and time header rows become the slot index and the
+    participant rows become a boolean matrix where cells equal to `ok` are marked available.
+    The trailing 'Count' row of the export is dropped.
+    """
+    poll = pd.read_excel(file, header=None)
+    return parse_poll(poll, ok=ok)
+
+
+def parse_poll(poll, ok='OK'):
+    """Parse a raw (header-less) doodle poll dataframe into an `AvailabilityMatrix`."""
+    header = poll.iloc[[MONTH_ROW, DATE_ROW, TIME_ROW], 1:].ffill(axis=1)
+    slots = parse_slots(header.iloc[0], header.iloc[1], header.iloc[2])
+
+    body = poll.iloc[FIRST_PARTICIPANT_ROW:]
+    names = body.iloc[:, 0]
+    keep = names.notna() & (names.astype(str).str.strip() != 'Count')
+    body = body[keep]
+
+    available = body.iloc[:, 1:].to_numpy(dtype=object) == ok
+
+    return AvailabilityMatrix(body.iloc[:, 0].astype(str).to_numpy(), slots, available)
+
+
+def parse_slots(months, days, times):
+    """Build the slot index from the month ('November 2020'), date ('Tue 3') and time
+    ('08:00 – 11:30') header rows. Each distinct string is parsed only once.
+    """
+    exact_dates = pd.Series(months).astype(str).to_numpy() + ' ' + pd.Series(days).astype(str).to_numpy()
+    times = pd.Series(times).astype(str).to_numpy()
+
+    parsed_dates = {text: dateutil.parser.parse(text) for text in set(exact_dates)}
+    parsed_times = {text: _parse_slot(text) for text in set(times)}
+
+    dates = [parsed_dates[text] for text in exact_dates]
+    starts = []
+    ends = []
+    for date, text in zip(dates, times):
+        start, end = parsed_times[text]
+        start = datetime.combine(date.date(), start)
+        end = datetime.combine(date.date(), end)
+        if end <= start:  # slot runs past midnight
+            end += timedelta(days=1)
+        starts.append(start)
+        ends.append(end)
+
+    return pd.DataFrame({'Date': pd.to_datetime(dates),
+                         'Timeslots': times,
+                         'Start': pd.to_datetime(starts),
+                         'End': pd.to_datetime(ends)})
+
+
+def _parse_slot(text):
+    start, end = _SLOT_SEPARATOR.split(text.strip(), maxsplit=1)
+    return dateutil.parser.parse(start).time(), dateutil.parser.parse(end).time()
+
+
+# =============================================================================
+# Availability index
+# =============================================================================
+class AvailabilityIndex:
+    """Persistent bitset index answering availability queries without re-reading the poll.
+
+    Each participant's slots and each slot's participants are stored as packed bitsets, and
+    slots are kept sorted by start time so that time ranges are found by binary search.
+
+    Examples
+    --------
+    >>> import autocalendar
+    >>> index = autocalendar.AvailabilityIndex.from_poll('doodle_poll.xls')
+    >>> index.save('doodle_poll.idx.npz')
+    >>> index = autocalendar.AvailabilityIndex.load('doodle_poll.idx.npz')
+    >>> index.free_between('2020-11-05 12:00', '2020-11-05 16:00')
+    >>> index.common_slots(['Subject 7', 'Subject 10'])
+    """
+
+    def __init__(self, matrix):
+        order = np.argsort(matrix.slots['Start'].to_numpy(), kind='stable')
+        self.slots = matrix.slots.iloc[order].reset_index(drop=True)
+        self.participants = matrix.participants
+        available = matrix.available[:, order]
+
+        self.n_slots = available.shape[1]
+        self.by_participant = np.packbits(available, axis=1)  # participants × slot bits
+        self.by_slot = np.packbits(available.T, axis=1)  # slots × participant bits
+        self._starts = self.slots['Start'].to_numpy(dtype='datetime64[ns]')
+        self._ends = self.slots['End'].to_numpy(dtype='datetime64[ns]')
+        self._rows = {name: i for i, name in enumerate(self.participants)}
+
+    def __repr__(self):
+        return f'AvailabilityIndex({len(self.participants)} participants × {self.n_slots} slots)'
+
+    @classmethod
+    def from_poll(cls, file):
+        """Build the index from a doodle poll file (see `read_poll()`)."""
+        return cls(read_poll(file))
+
+    def to_matrix(self):
+        """The indexed `AvailabilityMatrix` (with slots sorted by start time)."""
+        available = np.unpackbits(self.by_participant, axis=1, count=self.n_slots).astype(bool)
+        return AvailabilityMatrix(self.participants, self.slots, available)
+
+    # Persistence
+    def save(self, path):
+        """Save the index to a '.npz' file."""
+        np.savez_compressed(path,
+                            participants=self.participants.astype(str),
+                            dates=self.slots['Date'].to_numpy(dtype='datetime64[ns]'),
+                            timeslots=self.slots['Timeslots'].to_numpy().astype(str),
+                            starts=self._starts,
+                            ends=self._ends,
+                            by_participant=self.by_participant)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with `save()`."""
+        with np.load(path) as content:
+            slots = pd.DataFrame({'Date': content['dates'],
+                                  'Timeslots': content['timeslots'].astype(object),
+                                  'Start': content['starts'],
+                                  'End': content['ends']})
+            available = np.unpackbits(content['by_participant'], axis=1, count=len(slots)).astype(bool)
+            return cls(AvailabilityMatrix(content['participants'].astype(object), slots, available))
+
+    # Queries
+    def slots_between(self, start, end):
+        """Positions (in `slots`) of the slots lying entirely within [start, end]."""
+        start = np.datetime64(pd.Timestamp(start), 'ns')
+        end = np.datetime64(pd.Timestamp(end), 'ns')
+        first = np.searchsorted(self._starts, start, side='left')
+        last = np.searchsorted(self._starts, end, side='right')
+        return first + np.flatnonzero(self._ends[first:last] <= end)
+
+    def free_between(self, start, end, all_slots=False):
+        """Participants available for a slot within [start, end] (for every such slot if
+        `all_slots`).
+        """
+        positions = self.slots_between(start, end)
+        if len(positions) == 0:
+            return self.participants[:0]
+        reduce = np.bitwise_and if all_slots else np.bitwise_or
+        bits = reduce.reduce(self.by_slot[positions], axis=0)
+        return self.participants[self._unpack(bits, len(self.participants))]
+
+    def common_slots(self, participants):
+        """Slots that all of `participants` are available for."""
+        bits = np.bitwise_and.reduce(self.by_participant[self._positions(participants)], axis=0)
+        return self.slots[self._unpack(bits, self.n_slots)]
+
+    def slots_with_at_least(self, participants, k):
+        """Slots that at least `k` of `participants` are available for, with their 'Available'
+        count.
+        """
+        counts = np.unpackbits(self.by_participant[self._positions(participants)], axis=1,
+                               count=self.n_slots).sum(axis=0)
+        slots = self.slots[counts >= k].copy()
+        slots['Available'] = counts[counts >= k]
+        return slots
+
+    def slots_of(self, participant):
+        """Slots that `participant` is available for."""
+        return self.slots[self._unpack(self.by_participant[self._rows[participant]], self.n_slots)]
+
+    def _positions(self, participants):
+        return np.array([self._rows[name] for name in participants], dtype=int)
+
+    @staticmethod
+    def _unpack(bits, count):
+        return np.unpackbits(bits, count=count).astype(bool)
@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone as _timezone
+
+import numpy as np
+import pandas as pd
+
+from .calendars import resolve_calendar_id
+from .conflicts import BusyIndex, event_times, query_busy
+from .instrument import execute
+from .recurrence import occurrences
+from .submission import _calendar, _new_id, insert_events, submit_events
+
+# Times without offset such as '2021-01-04T09:00:00'
+_LOCAL_TIME = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}$')
+
+# Time zones referenced by iCalendar properties, e.g. 'DTSTART;TZID=Asia/Singapore:...'
+_TZID = re.compile(r';TZID=([^;:]+)')
+
+
+# =============================================================================
+# Backend interface
+# =============================================================================
+class CalendarBackend:
+    """Where events are planned and written to.
+
+    `add_event()` and `add_sessions()` accept a backend in place of the googleapiclient
+    `service`. Subclasses implement `calendar_id()`, `insert()` and `list()`; `insert_many()`
+    and `busy()` fall back to these but can be overridden with bulk versions.
+
+    Event bodies are those created by `create_event()`. Times without an offset are read in
+    their 'timeZone' or else in `timezone`. Recurring events (with a 'recurrence', see
+    `collapse_series()`) are busy at each of their `occurrences()`.
+    """
+
+    timezone = 'Asia/Singapore'
+
+    def calendar_id(self, name):
+        """ID of the calendar named `name` ('primary' for the default calendar)."""
+        raise NotImplementedError
+
+    def insert(self, event, calendar_id='primary'):
+        """Insert one event and return its ID."""
+        raise NotImplementedError
+
+    def insert_many(self, events, calendar_id='primary'):
+        """Insert events (`calendar_id` can be one ID per event). A failing event does not abort
+        the others. Returns one dictionary per event with the created event 'id' and the
+        'error' raised for it (None on success), as `insert_events()`.
+        """
+        results = []
+        for i, event in enumerate(events):
+            try:
+                results.append({'id': self.insert(event, _calendar(calendar_id, i)), 'error': None})
+            except Exception as error:
+                results.append({'id': None, 'error': error})
+        return results
+
+    def list(self, calendar_id='primary', time_min=None, time_max=None):
+        """Event bodies of `calendar_id`, optionally only those overlapping [time_min, time_max)."""
+        raise NotImplementedError
+
+    def busy(self, calendar_ids, time_min, time_max):
+        """Busy intervals of `calendar_ids` between `time_min` and `time_max` (timezone aware),
+        as a `BusyIndex`.
+        """
+        return BusyIndex({calendar_id: _intervals(self.list(calendar_id, time_min, time_max), self.timezone)
+                          for calendar_id in dict.fromkeys(calendar_ids)})
+
+
+def as_backend(service, **options):
+    """`service` itself if it is a `CalendarBackend`, else a `GoogleBackend` wrapping it with
+    `options`.
+    """
+    if isinstance(service, CalendarBackend):
+        return service
+    return GoogleBackend(service, **options)
+
+
+# =============================================================================
+# Google Calendar
+# =============================================================================
+class GoogleBackend(CalendarBackend):
+    """Google Calendar, through the resource built from the googleapiclient.
+
+    Calendar names are resolved with `resolver` (see `resolve_calendar_id()`). Events are
+    inserted with batch requests of `batch_size` (see `insert_events()`) or, if `workers` is
+    set, concurrently within `qps` queries per second (see `submit_events()`).
+
+    Examples
+    --------
+    >>> backend = autocalendar.GoogleBackend(autocalendar.setup_oath('token.pkl', 'client_secret.json'))
+    >>> autocalendar.add_event(backend, dates, start_points, end_points, locations, to_add, ...)
+    """
+
+    def __init__(self, service, resolver=None, batch_size=None, workers=None, qps=10):
+        self.service = service
+        self.resolver = resolver
+        self.batch_size = batch_size
+        self.workers = workers
+        self.qps = qps
+
+    def calendar_id(self, name):
+        return resolve_calendar_id(self.service, name, resolver=self.resolver)
+
+    def insert(self, event, calendar_id='primary'):
+        response = execute(self.service.events().insert(calendarId=calendar_id, body=event), 'events.insert')
+        return response.get('id')
+
+    def insert_many(self, events, calendar_id='primary'):
+        if self.workers is not None:
+            return submit_events(self.service, events, calendar_id=calendar_id, workers=self.workers,
+                                 qps=self.qps, batch_size=self.batch_size or 1)
+        return insert_events(self.service, events, calendar_id=calendar_id,
+                             **({} if self.batch_size is None else {'batch_size': self.batch_size}))
+
+    def list(self, calendar_id='primary', time_min=None, time_max=None):
+        window = {}
+        if time_min is not None:
+            window['timeMin'] = _rfc3339(time_min)
+        if time_max is not None:
+            window['timeMax'] = _rfc3339(time_max)
+
+        events = []
+        page_token = None
+        while True:
+            result = execute(self.service.events().list(calendarId=calendar_id, pageToken=page_token,
+                                                        singleEvents=True, **window), 'events.list')
+            events.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return events
+
+    def busy(self, calendar_ids, time_min, time_max):
+        return query_busy(self.service, calendar_ids, time_min, time_max)
+
+
+# =============================================================================
+# Local backends
+# =============================================================================
+class SQLiteBackend(CalendarBackend):
+    """Local calendar store in an SQLite file, for dry runs and offline planning.
+
+    Calendar names are used as calendar IDs. Events keep their 'id' if they have one (e.g.
+    from `sync_events()`), otherwise they get a random ID valid in google calendar, so that
+    they can later be sent there unchanged with `push()`, or exported with `to_ics()`.
+    Each occurrence of an event (one per event, or one per repeat of a recurring event) is
+    indexed by calendar and UTC start time, so free/busy checks only read the requested window.
+
+    Examples
+    --------
+    >>> with autocalendar.SQLiteBackend('plan.db') as backend:
+    ...     autocalendar.add_event(backend, dates, start_points, end_points, locations, to_add, ...)
+    ...     backend.to_ics('plan.ics')
+    ...     backend.push(autocalendar.GoogleBackend(service, batch_size=50))
+    """
+
+    def __init__(self, path, timezone='Asia/Singapore'):
+        self.path = path
+        self.timezone = timezone
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            'CREATE TABLE IF NOT EXISTS events ('
+            ' id TEXT NOT NULL, calendar_id TEXT NOT NULL, start_time INTEGER NOT NULL,'
+            ' end_time INTEGER NOT NULL, body TEXT NOT NULL, PRIMARY KEY (calendar_id, id));'
+            'CREATE INDEX IF NOT EXISTS events_by_start ON events (calendar_id, start_time);'
+            'CREATE TABLE IF NOT EXISTS occurrences ('
+            ' id TEXT NOT NULL, calendar_id TEXT NOT NULL, start_time INTEGER NOT NULL,'
+            ' end_time INTEGER NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS occurrences_by_start ON occurrences (calendar_id, start_time);')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def calendar_id(self, name):
+        return name
+
+    def calendars(self):
+        """IDs of the calendars holding events."""
+        return [row[0] for row in self._connection.execute('SELECT DISTINCT calendar_id FROM events')]
+
+    def insert(self, event, calendar_id='primary'):
+        result = self.insert_many([event], calendar_id=[calendar_id])[0]
+        if result['error'] is not None:
+            raise result['error']
+        return result['id']
+
+    def insert_many(self, events, calendar_id='primary'):
+        starts = _seconds(event_times(events, 'start', self.timezone))
+        ends = _seconds(event_times(events, 'end', self.timezone))
+
+        results = []
+        rows = []  # occurrences of the inserted events
+        with self._connection:  # one transaction
+            for i, event in enumerate(events):
+                event = dict(event, id=event.get('id') or _new_id())
+                calendar = _calendar(calendar_id, i)
+                try:
+                    intervals = [(int(starts[i]), int(ends[i]))]
+                    if event.get('recurrence'):
+                        repeats = occurrences(event, self.timezone)
+                        intervals = list(zip(_seconds(repeats['Start']), _seconds(repeats['End'])))
+                    self._connection.execute('INSERT INTO events VALUES (?, ?, ?, ?, ?)',
+                                             (event['id'], calendar, int(starts[i]), int(ends[i]),
+                                              json.dumps(event)))
+                except (ValueError, sqlite3.IntegrityError) as error:  # unsupported recurrence or existing event
+                    results.append({'id': None, 'error': error})
+                else:
+                    rows.extend((event['id'], calendar, int(start), int(end)) for start, end in intervals)
+                    results.append({'id': event['id'], 'error': None})
+            self._connection.executemany('INSERT INTO occurrences VALUES (?, ?, ?, ?)', rows)
+        return results
+
+    def list(self, calendar_id='primary', time_min=None, time_max=None):
+        query, parameters = self._window(time_min, time_max)
+        if query:  # events with an occurrence in the window
+            query = ' AND id IN (SELECT id FROM occurrences WHERE calendar_id = ?' + query + ')'
+            parameters = [calendar_id, *parameters]
+        rows = self._connection.execute('SELECT body FROM events WHERE calendar_id = ?' + query
+                                        + ' ORDER BY start_time', [calendar_id, *parameters])
+        return [json.loads(body) for body, in rows]
+
+    def busy(self, calendar_ids, time_min, time_max):
+        query, parameters = self._window(time_min, time_max)
+        busy = {}
+        for calendar_id in dict.fromkeys(calendar_ids):
+            rows = self._connection.execute('SELECT start_time, end_time FROM occurrences WHERE calendar_id = ?'
+                                            + query, [calendar_id, *parameters]).fetchall()
+            seconds = pd.DataFrame(rows, columns=['Start', 'End'], dtype='int64')
+            busy[calendar_id] = seconds.apply(pd.to_datetime, unit='s', utc=True)
+        return BusyIndex(busy)
+
+    def delete(self, calendar_id=None):
+        """Remove the events of `calendar_id` (of all calendars if None), e.g. after `push()`."""
+        with self._connection:
+            for table in ('events', 'occurrences'):
+                if calendar_id is None:
+                    self._connection.execute(f'DELETE FROM {table}')
+                else:
+                    self._connection.execute(f'DELETE FROM {table} WHERE calendar_id = ?', (calendar_id,))
+
+    def push(self, backend, calendar_ids=None):
+        """Insert the stored events of `calendar_ids` (all calendars by default) into another
+        backend, e.g., a `GoogleBackend`, in one bulk call per calendar. Returns the results of
+        `insert_many()` for each calendar.
+        """
+        return {calendar_id: backend.insert_many(self.list(calendar_id), backend.calendar_id(calendar_id))
+                for calendar_id in (calendar_ids if calendar_ids is not None else self.calendars())}
+
+    def to_ics(self, path, calendar_id=None):
+        """Write the events of `calendar_id` (of all calendars if None) to an '.ics' file."""
+        calendar_ids = [calendar_id] if calendar_id is not None else self.calendars()
+        write_ics([event for calendar in calendar_ids for event in self.list(calendar)], path,
+                  name=calendar_id)
+
+    @staticmethod
+    def _window(time_min, time_max):
+        query, parameters = '', []
+        if time_max is not None:
+            query += ' AND start_time < ?'
+            parameters.append(_utc(time_max).value // 10 ** 9)
+        if time_min is not None:
+            query += ' AND end_time > ?'
+            parameters.append(_utc(time_min).value // 10 ** 9)
+        return query, parameters
+
+
+class ICSBackend(CalendarBackend):
+    """Plan events in memory and write them out as iCalendar ('.ics') files, which can be
+    imported into google calendar (or any other calendar) in one go.
+
+    If `path` contains '{calendar}', one file is written per calendar, e.g. 'plan-{calendar}.ics';
+    otherwise all events go to `path`. Files are written by `save()`, which is called on exiting
+    the `with` block.
+
+    Examples
+    --------
+    >>> with autocalendar.ICSBackend('sessions.ics') as backend:
+    ...     autocalendar.add_event(backend, dates, start_points, end_points, locations, to_add, ...)
+    """
+
+    def __init__(self, path, timezone='Asia/Singapore'):
+        self.path = path
+        self.timezone = timezone
+        self.events = {}  # calendar ID: {event ID: body}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.save()
+
+    def calendar_id(self, name):
+        return name
+
+    def insert(self, event, calendar_id='primary'):
+        events = self.events.setdefault(calendar_id, {})
+        event = dict(event, id=event.get('id') or _new_id())
+        if event['id'] in events:
+            raise ValueError(f"Event '{event['id']}' already exists in calendar '{calendar_id}'.")
+        if event.get('recurrence'):
+            occurrences(event, self.timezone)  # raises if it cannot be expanded by `busy()`
+        events[event['id']] = event
+        return event['id']
+
+    def list(self, calendar_id='primary', time_min=None, time_max=None):
+        events = list(self.events.get(calendar_id, {}).values())
+        if events and (time_min is not None or time_max is not None):
+            intervals = _intervals(events, self.timezone)
+            keep = pd.Series(True, index=intervals.index)
+            if time_max is not None:
+                keep &= intervals['Start'] < _utc(time_max)
+            if time_min is not None:
+                keep &= intervals['End'] > _utc(time_min)
+            overlapping = set(intervals['Event'][keep])
+            events = [event for i, event in enumerate(events) if i in overlapping]
+        return events
+
+    def save(self):
+        """Write the planned events to `path`."""
+        if '{calendar}' in self.path:
+            for calendar_id, events in self.events.items():
+                write_ics(events.values(), self.path.format(calendar=_filename(calendar_id)),
+                          name=calendar_id)
+        else:
+            write_ics([event for events in self.events.values() for event in events.values()],
+                      self.path, name=next(iter(self.events), None) if len(self.events) == 1 else None)
+
+
+# =============================================================================
+# iCalendar export
+# =============================================================================
+def write_ics(events, path, name=None):
+    """Write event bodies (as created by `create_event()`) to an iCalendar file at `path`.
+
+    Times are written in the event's 'timeZone' (as a TZID), popup reminders as alarms and
+    'recurrence' rules as they are. Each TZID gets a VTIMEZONE with the zone's UTC offset
+    changes over the years of the events (so that recurring events keep their local time
+    across daylight saving changes). `name` is the calendar name shown on import.
+    """
+    stamp = datetime.now(_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//autocalendar//EN', 'CALSCALE:GREGORIAN']
+    if name is not None:
+        lines.append('X-WR-CALNAME:' + _escape(name))
+
+    event_lines = []
+    spans = {}  # TZID: [first, last] year of the events using it
+    for event in events:
+        times = ['DTSTART' + _ics_time(event['start']), 'DTEND' + _ics_time(event['end'])]
+        times += event.get('recurrence', [])
+        zones = {zone for line in times for zone in _TZID.findall(line)}
+        if zones:
+            first, last = _years(event)
+            for zone in zones:
+                span = spans.setdefault(zone, [first, last])
+                span[:] = min(span[0], first), max(span[1], last)
+
+        event_lines += ['BEGIN:VEVENT',
+                        'UID:' + (event.get('id') or _new_id()) + '@autocalendar',
+                        'DTSTAMP:' + stamp] + times
+        for field, key in (('SUMMARY', 'summary'), ('LOCATION', 'location'), ('DESCRIPTION', 'description')):
+            if event.get(key) not in (None, ''):
+                event_lines.append(f'{field}:' + _escape(event[key]))
+        for reminder in event.get('reminders', {}).get('overrides', []):
+            if reminder.get('method') == 'popup':
+                event_lines += ['BEGIN:VALARM', 'ACTION:DISPLAY', 'DESCRIPTION:Reminder',
+                                f"TRIGGER:-PT{int(reminder['minutes'])}M", 'END:VALARM']
+        event_lines.append('END:VEVENT')
+
+    for zone, (first, last) in spans.items():
+        lines += _vtimezone(zone, first - 1, last)  # from a year early, for times near new year
+    lines += event_lines
+    lines.append('END:VCALENDAR')
+
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        file.write(''.join(_fold(line) + '\r\n' for line in lines))
+
+
+def _ics_time(time):
+    """Parameters and value of a DTSTART/DTEND property, e.g. ';TZID=Asia/Singapore:20210104T110000'."""
+    if 'date' in time:
+        return ';VALUE=DATE:' + time['date'].replace('-', '')
+    if 'timeZone' in time and _LOCAL_TIME.match(time['dateTime']):  # as written by `create_event()`
+        return f";TZID={time['timeZone']}:" + time['dateTime'].replace('-', '').replace(':', '')
+    timestamp = pd.Timestamp(time['dateTime'])
+    if timestamp.tz is not None:
+        return ':' + timestamp.tz_convert('UTC').strftime('%Y%m%dT%H%M%SZ')
+    if 'timeZone' in time:
+        return f";TZID={time['timeZone']}:" + timestamp.strftime('%Y%m%dT%H%M%S')
+    return ':' + timestamp.strftime('%Y%m%dT%H%M%S')  # floating time
+
+
+def _years(event):
+    """Years of the start and end of an event, over all its occurrences if recurring."""
+    first = int(event['start'].get('dateTime', event['start'].get('date'))[:4])
+    last = int(event['end'].get('dateTime', event['end'].get('date'))[:4])
+    if event.get('recurrence'):
+        try:
+            last = max(last, occurrences(event)['End'].max().year)
+        except ValueError:  # e.g. an unbounded rule: cover the next ten years
+            last = first + 10
+    return first, last
+
+
+def _vtimezone(zone, first, last):
+    """VTIMEZONE component of `zone`, with one STANDARD or DAYLIGHT observance per UTC offset
+    change from the start of year `first` to the end of year `last`.
+    """
+    instants = pd.date_range(pd.Timestamp(year=first, month=1, day=1, tz='UTC'),
+                             pd.Timestamp(year=last + 1, month=1, day=1, tz='UTC'), freq='15min')
+    local = instants.tz_convert(zone)
+    offsets = local.tz_localize(None) - instants.tz_localize(None)
+    changes = np.flatnonzero(offsets[1:] != offsets[:-1]) + 1
+
+    lines = ['BEGIN:VTIMEZONE', 'TZID:' + zone]
+    for i, offset_from in [(0, offsets[0])] + [(i, offsets[i - 1]) for i in changes]:
+        kind = 'DAYLIGHT' if local[i].dst() else 'STANDARD'
+        lines += [f'BEGIN:{kind}',
+                  'DTSTART:' + (instants[i].tz_localize(None) + offset_from).strftime('%Y%m%dT%H%M%S'),
+                  'TZOFFSETFROM:' + _utc_offset(offset_from),
+                  'TZOFFSETTO:' + _utc_offset(offsets[i]),
+                  'TZNAME:' + local[i].tzname(),
+                  f'END:{kind}']
+    lines.append('END:VTIMEZONE')
+    return lines
+
+
+def _utc_offset(offset):
+    """UTC offset as in iCalendar, e.g. '+0800'."""
+    minutes = int(offset.total_seconds()) // 60
+    return ('-' if minutes < 0 else '+') + f'{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line, limit=75):
+    """Fold a content line into chunks of at most `limit` octets (RFC 5545)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= limit:
+        return line
+    chunks = []
+    while encoded:
+        size = min(limit if not chunks else limit - 1, len(encoded))
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:  # inside a UTF-8 character
+            size -= 1
+        chunks.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return '\r\n '.join(chunks)
+
+
+# =============================================================================
+# Internals
+# =============================================================================
+def _intervals(events, timezone):
+    """UTC 'Start' and 'End' of each occurrence of `events`, with the index of its 'Event'."""
+    single = [i for i, event in enumerate(events) if not event.get('recurrence')]
+    frames = [pd.DataFrame({'Event': single,
+                            'Start': event_times([events[i] for i in single], 'start', timezone),
+                            'End': event_times([events[i] for i in single], 'end', timezone)})]
+    frames += [occurrences(event, timezone).assign(Event=i) for i, event in enumerate(events)
+               if event.get('recurrence')]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _seconds(times):
+    """UTC timestamps as an array of seconds since the epoch."""
+    times = pd.to_datetime(pd.Series(times).reset_index(drop=True), utc=True)
+    return (times - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(1, 's')
+
+
+def _utc(time):
+    """`time` as a UTC timestamp (naive times are taken as UTC)."""
+    timestamp = pd.Timestamp(time)
+    if timestamp.tz is None:
+        return timestamp.tz_localize('UTC')
+    return timestamp.tz_convert('UTC')
+
+
+def _rfc3339(time):
+    return _utc(time).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _filename(calendar_id):
+    return ''.join(character if character.isalnum() or character in '-_.@' else '_'
+                   for character in calendar_id)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os.path
+import threading
+import time
+import uuid
+import weakref
+
+from .instrument import execute
+
+
+# =============================================================================
+# Calendar name to ID resolution
+# =============================================================================
+class CalendarResolver:
+    """Resolve calendar names (as shown in google calendar) to calendar IDs.
+
+    The full calendar list is fetched once, following every page, and kept as a name→ID index
+    for `ttl` seconds. Each account (the credentials of the service) has its own index, so
+    services of different accounts never share calendar IDs. If `cache_path` is given, the
+    indexes are also saved as JSON there, under a hash of each account's credentials, so they
+    can be reused across sessions.
+
+    Examples
+    --------
+    >>> import autocalendar
+    >>> resolver = autocalendar.CalendarResolver(ttl=24 * 60 * 60, cache_path='calendars.json')
+    >>> calendar_id = resolver.resolve(service, 'Lab Use (NTU)')
+    """
+
+    def __init__(self, ttl=3600, cache_path=None):
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self._accounts = {}  # account key: {'fetched': time, 'calendars': {name: ID}}
+        self._lock = threading.Lock()
+
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path) as cache:
+                content = json.load(cache)
+            self._accounts = content.get('accounts', {})  # caches without accounts are dropped
+
+    def resolve(self, service, name):
+        """Return the ID of the calendar named `name`. 'primary' and known calendar IDs are
+        returned unchanged. The calendar list is fetched again if the cached index is stale or
+        does not contain `name`.
+        """
+        if name == 'primary':
+            return name
+
+        account = account_key(service)
+        with self._lock:
+            cached = self._accounts.get(account)
+            if cached is None or time.time() - cached['fetched'] > self.ttl:
+                self._refresh(service, account)
+            elif name not in cached['calendars'] and name not in cached['calendars'].values():
+                self._refresh(service, account)  # calendar may have been created since
+
+            index = self._accounts[account]['calendars']
+            if name in index:
+                return index[name]
+            if name in index.values():
+                return name
+
+        raise ValueError(f"No calendar named '{name}' was found in the calendar list.")
+
+    def refresh(self, service):
+        """Fetch the calendar list of `service`'s account again."""
+        with self._lock:
+            self._refresh(service, account_key(service))
+
+    def invalidate(self, service=None):
+        """Drop the in-memory index of `service`'s account, or of all accounts if None (the disk
+        cache, if any, is overwritten on next fetch).
+        """
+        with self._lock:
+            if service is None:
+                self._accounts = {}
+            else:
+                self._accounts.pop(account_key(service), None)
+
+    def _refresh(self, service, account):
+        index = {}
+        page_token = None
+        while True:
+            result = execute(service.calendarList().list(pageToken=page_token), 'calendarList.list')
+            for item in result.get('items', []):
+                index.setdefault(item['summary'], item['id'])
+                if 'summaryOverride' in item:
+                    index.setdefault(item['summaryOverride'], item['id'])
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+        self._accounts[account] = {'fetched': time.time(), 'calendars': index}
+
+        if self.cache_path is not None:
+            # Only accounts identified by their credentials are meaningful in other sessions
+            persistent = {key: value for key, value in self._accounts.items()
+                          if not key.startswith('service:')}
+            with open(self.cache_path, 'w') as cache:
+                json.dump({'accounts': persistent}, cache)
+
+
+# Keys of services whose credentials cannot be identified, kept only while the service lives
+_service_keys = weakref.WeakKeyDictionary()
+_service_keys_lock = threading.Lock()
+
+
+def account_key(service):
+    """Key identifying the account of `service`: a hash of its credentials (client ID and
+    refresh token, or service account email) if available, otherwise a key unique to the
+    `service` object.
+    """
+    credentials = getattr(getattr(service, '_http', None), 'credentials', None)
+    identity = [getattr(credentials, name, None)
+                for name in ('client_id', 'refresh_token', 'service_account_email')]
+    if any(identity):
+        return 'account:' + hashlib.sha1(json.dumps(identity).encode('utf-8')).hexdigest()
+
+    with _service_keys_lock:
+        if service not in _service_keys:
+            _service_keys[service] = 'service:' + uuid.uuid4().hex
+        return _service_keys[service]
+
+
+# Shared by `add_event()` calls within a session
+default_resolver = CalendarResolver()
+
+
+def resolve_calendar_id(service, name, resolver=None):
+    """Return the ID of the calendar named `name`, using `resolver` (a `CalendarResolver`) or
+    the in-memory resolver shared by all `add_event()` calls (which keeps one index per account).
+    """
+    if resolver is None:
+        resolver = default_resolver
+    return resolver.resolve(service, name)
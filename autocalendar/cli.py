@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Command line interface: allocate many doodle polls in parallel.
+
+    autocalendar-allocate polls/ --type optimal --export-to csv --workers 8
+    autocalendar-allocate "exports/week*.xls" --output-dir allocations
+"""
+import argparse
+import glob
+import os.path
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+POLL_EXTENSIONS = ('.xls', '.xlsx')
+
+# Appended to the name of each poll for its exported allocations
+OUTPUT_SUFFIX = '_allocations'
+
+
+def find_polls(paths, output_dir=None):
+    """Doodle poll files from a list of files, directories and glob patterns.
+
+    Allocations exported by an earlier run (files ending in '_allocations', or anything in
+    `output_dir`) are left out, so that the same directory can be allocated again.
+    """
+    output_dir = os.path.abspath(output_dir) if output_dir is not None else None
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            matches = sorted(glob.glob(path)) or [path]
+        files += [match for match in matches
+                  if os.path.isfile(match) and match.lower().endswith(POLL_EXTENSIONS)
+                  and not os.path.splitext(match)[0].endswith(OUTPUT_SUFFIX)
+                  and (output_dir is None or not os.path.abspath(match).startswith(output_dir + os.sep))]
+    return list(dict.fromkeys(files))
+
+
+def allocate_file(file, allocate_type='single', export_to='xlsx', output_dir=None, seed=None, restarts=1):
+    """Allocate one poll and export the allocations next to it (or in `output_dir`).
+
+    Returns the file, the exported file name and the participants who could not be allocated.
+    """
+    from .autocalendar import autoallocate
+    from .instrument import instrument
+
+    stem = os.path.splitext(os.path.basename(file))[0] + OUTPUT_SUFFIX
+    filename = os.path.join(output_dir or os.path.dirname(file), stem)
+
+    with instrument() as recorder:
+        autoallocate(file, allocate_type=allocate_type, filename=filename, export_to=export_to,
+                     silent=True, seed=seed, restarts=restarts)
+    return file, filename + '.' + export_to, recorder.notes.get('unallocated', [])
+
+
+def allocate_files(files, allocate_type='single', export_to='xlsx', output_dir=None, workers=None,
+                   seed=None, restarts=1):
+    """Allocate polls in a process pool of `workers` processes (all cores by default).
+
+    Returns a list of (file, exported file, unallocated participants or the error raised).
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    reports = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(allocate_file, file, allocate_type, export_to, output_dir, seed, restarts)
+                   for file in files]
+        for file, future in zip(files, futures):
+            try:
+                reports.append(future.result())
+            except Exception as error:
+                reports.append((file, None, error))
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='autocalendar-allocate',
+                                     description='Allocate participants to slots for many doodle polls.')
+    parser.add_argument('paths', nargs='+', help='Poll files, directories or glob patterns.')
+    parser.add_argument('--type', dest='allocate_type', default='single',
+                        choices=['single', 'multiple', 'optimal', 'balanced'],
+                        help='Allocation type (see `autoallocate`).')
+    parser.add_argument('--export-to', default='xlsx', choices=['xlsx', 'csv'],
+                        help='File type of the exported allocations.')
+    parser.add_argument('--output-dir', help='Directory for the allocations (next to each poll by default).')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (all cores by default).')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible allocations.')
+    parser.add_argument('--restarts', type=int, default=1, help='Random allocations drawn per poll (best is kept).')
+    args = parser.parse_args(argv)
+    if args.restarts < 1:
+        parser.error('--restarts must be at least 1')
+
+    files = find_polls(args.paths, output_dir=args.output_dir)
+    if not files:
+        print('No doodle poll files found.', file=sys.stderr)
+        return 1
+
+    reports = allocate_files(files, allocate_type=args.allocate_type, export_to=args.export_to,
+                             output_dir=args.output_dir, workers=args.workers, seed=args.seed,
+                             restarts=args.restarts)
+
+    # Aggregate report
+    failed = 0
+    n_unallocated = 0
+    for file, exported, unallocated in reports:
+        if isinstance(unallocated, Exception):
+            failed += 1
+            print(f'{file}: failed ({unallocated})')
+        elif unallocated:
+            n_unallocated += len(unallocated)
+            print(f'{file}: ' + ', '.join(map(str, unallocated)) + ' could not be allocated.')
+        else:
+            print(f'{file}: all participants successfully allocated.')
+
+    print(f'\n{len(reports) - failed} of {len(reports)} polls allocated, '
+          f'{n_unallocated} participants could not be allocated.')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
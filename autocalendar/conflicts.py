@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from .instrument import execute
+
+# Calendars per free/busy query (API limit)
+MAX_FREEBUSY_CALENDARS = 50
+
+# Longest time window of a single free/busy query
+MAX_FREEBUSY_SPAN = pd.Timedelta(days=60)
+
+_EPOCH = pd.Timestamp(0, tz='UTC')
+
+
+# =============================================================================
+# Busy intervals
+# =============================================================================
+class BusyIndex:
+    """Busy intervals of each calendar, merged and sorted for O(log m) overlap checks.
+
+    `busy` is a dictionary of {calendar_id: list of (start, end)}, with timezone-aware
+    timestamps or strings (as returned by the free/busy API), or of {calendar_id: dataframe}
+    with 'Start' and 'End' columns (as returned by `busy()`).
+
+    `errors` is a dictionary of {calendar_id: list of reasons} for the calendars whose busy
+    times could not be read (e.g. 'notFound'), whose intervals are then unknown, not free.
+    """
+
+    def __init__(self, busy, errors=None):
+        self.intervals = {calendar_id: _merge(intervals) for calendar_id, intervals in busy.items()}
+        self.errors = dict(errors or {})
+
+    def overlaps(self, calendar_id, starts, ends):
+        """For each interval [start, end), whether it overlaps a busy interval of `calendar_id`.
+
+        Returns a boolean array and the index of the overlapping busy interval (-1 if none).
+        """
+        busy_starts, busy_ends = self.intervals.get(calendar_id, (np.array([], dtype='int64'),) * 2)
+        starts = _nanoseconds(starts)
+        ends = _nanoseconds(ends)
+
+        # Last busy interval starting before each event ends; merged intervals have sorted ends
+        candidate = np.searchsorted(busy_starts, ends, side='left') - 1
+        valid = candidate >= 0
+        conflict = np.zeros(len(starts), dtype=bool)
+        conflict[valid] = busy_ends[candidate[valid]] > starts[valid]
+        return conflict, np.where(conflict, candidate, -1)
+
+    def busy(self, calendar_id):
+        """Merged busy intervals of `calendar_id` as a dataframe of UTC 'Start' and 'End'."""
+        starts, ends = self.intervals.get(calendar_id, ([], []))
+        return pd.DataFrame({'Start': pd.to_datetime(starts, utc=True), 'End': pd.to_datetime(ends, utc=True)})
+
+
+def query_busy(service, calendar_ids, time_min, time_max):
+    """Fetch the busy intervals of `calendar_ids` between `time_min` and `time_max` (timezone
+    aware) with as few free/busy queries as the API limits allow, as a `BusyIndex`.
+
+    Calendars the API reports errors for (e.g. not found, or no access to their free/busy
+    times) are listed with the reasons in the index's `errors`.
+    """
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    time_min = pd.Timestamp(time_min).tz_convert('UTC')
+    time_max = pd.Timestamp(time_max).tz_convert('UTC')
+
+    busy = {calendar_id: [] for calendar_id in calendar_ids}
+    errors = {}
+    for first in range(0, len(calendar_ids), MAX_FREEBUSY_CALENDARS):
+        items = [{'id': calendar_id} for calendar_id in calendar_ids[first:first + MAX_FREEBUSY_CALENDARS]]
+        window_start = time_min
+        while window_start < time_max:
+            window_end = min(window_start + MAX_FREEBUSY_SPAN, time_max)
+            body = {'timeMin': window_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'timeMax': window_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'items': items}
+            response = execute(service.freebusy().query(body=body), 'freebusy.query')
+            for calendar_id, content in response.get('calendars', {}).items():
+                busy.setdefault(calendar_id, []).extend(
+                    (interval['start'], interval['end']) for interval in content.get('busy', []))
+                for error in content.get('errors', []):
+                    reasons = errors.setdefault(calendar_id, [])
+                    if error.get('reason') not in reasons:
+                        reasons.append(error.get('reason'))
+            window_start = window_end
+
+    return BusyIndex(busy, errors)
+
+
+# =============================================================================
+# Conflict report
+# =============================================================================
+def find_conflicts(service, events, calendar_id='primary', timezone='Asia/Singapore',
+                   include_planned=True, busy=None):
+    """Check planned events against the calendars' busy times before inserting them.
+
+    All target calendars are queried together over the whole import window (see
+    `query_busy()`), then every event is checked against the sorted busy intervals, in
+    O((n + m) log m) for n events and m busy intervals.
+
+    Parameters
+    ----------
+    events : list
+        Event bodies, e.g. as created by `create_event()`.
+    calendar_id : str or list
+        Calendar ID for all events, or one per event.
+    timezone : str
+        Timezone of event times that carry no offset.
+    include_planned : bool
+        Also flag events overlapping an earlier planned event in the same calendar.
+    busy : BusyIndex
+        Busy intervals already fetched with `query_busy()`, to avoid querying again.
+
+    Raises
+    ------
+    ValueError
+        If the busy times of a calendar of `events` could not be read.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per event with its 'Calendar', 'Start' and 'End' (UTC), whether it is a
+        'Conflict', and the 'Busy Start' and 'Busy End' of the overlapping busy interval.
+    """
+    calendars = [calendar_id] * len(events) if isinstance(calendar_id, str) else list(calendar_id)
+    report = pd.DataFrame({'Calendar': calendars,
+                           'Start': event_times(events, 'start', timezone),
+                           'End': event_times(events, 'end', timezone)})
+    report['Conflict'] = False
+    report['Busy Start'] = pd.NaT
+    report['Busy End'] = pd.NaT
+    if len(events) == 0:
+        return report
+
+    if busy is None:
+        busy = query_busy(service, report['Calendar'].unique(), report['Start'].min(), report['End'].max())
+    failed = {calendar: busy.errors[calendar] for calendar in report['Calendar'].unique() if calendar in busy.errors}
+    if failed:
+        raise ValueError(f"Could not read the busy times of calendar(s) {failed} to check for conflicts.")
+
+    for calendar, rows in report.groupby('Calendar').indices.items():
+        conflict, which = busy.overlaps(calendar, report['Start'].iloc[rows], report['End'].iloc[rows])
+        intervals = busy.busy(calendar)
+        report.loc[report.index[rows[conflict]], 'Conflict'] = True
+        report.loc[report.index[rows[conflict]], 'Busy Start'] = intervals['Start'].to_numpy()[which[conflict]]
+        report.loc[report.index[rows[conflict]], 'Busy End'] = intervals['End'].to_numpy()[which[conflict]]
+
+        if include_planned:
+            # Sweep the calendar's events by start time, tracking the latest end so far
+            order = rows[np.argsort(report['Start'].iloc[rows].to_numpy(), kind='stable')]
+            ends = _nanoseconds(report['End'].iloc[order])
+            latest = np.maximum.accumulate(ends)
+            overlapping = np.zeros(len(order), dtype=bool)
+            overlapping[1:] = _nanoseconds(report['Start'].iloc[order])[1:] < latest[:-1]
+            report.loc[report.index[order[overlapping]], 'Conflict'] = True
+
+    return report
+
+
+def event_times(events, key, timezone):
+    """Start or end (`key`) of event bodies as UTC timestamps."""
+    times = pd.Series([event[key].get('dateTime', event[key].get('date')) for event in events], dtype=object)
+    zones = pd.Series([event[key].get('timeZone', timezone) for event in events], dtype=object)
+    result = pd.Series(pd.NaT, index=times.index, dtype='datetime64[ns, UTC]')
+    for zone, rows in zones.groupby(zones).groups.items():
+        parsed = pd.to_datetime(times[rows])
+        if parsed.dt.tz is None:
+            parsed = parsed.dt.tz_localize(zone)
+        result[rows] = parsed.dt.tz_convert('UTC')
+    return result
+
+
+def _merge(intervals):
+    """Sort and merge overlapping intervals into arrays of start and end nanoseconds."""
+    if len(intervals) == 0:
+        return np.array([], dtype='int64'), np.array([], dtype='int64')
+    if isinstance(intervals, pd.DataFrame):
+        starts, ends = _nanoseconds(intervals['Start']), _nanoseconds(intervals['End'])
+    else:
+        starts = _nanoseconds(pd.to_datetime([start for start, _ in intervals], utc=True))
+        ends = _nanoseconds(pd.to_datetime([end for _, end in intervals], utc=True))
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], np.maximum.accumulate(ends[order])
+
+    # A new merged interval begins where the start is past every earlier end
+    new = np.ones(len(starts), dtype=bool)
+    new[1:] = starts[1:] > ends[:-1]
+    groups = np.cumsum(new) - 1
+    merged_ends = np.zeros(groups[-1] + 1, dtype='int64')
+    np.maximum.at(merged_ends, groups, ends)
+    return starts[new], merged_ends
+
+
+def _nanoseconds(times):
+    times = pd.to_datetime(pd.Series(times).reset_index(drop=True), utc=True)
+    return ((times - _EPOCH) // pd.Timedelta(1, 'ns')).to_numpy(dtype='int64')
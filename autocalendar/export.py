@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import os.path
+
+import pandas as pd
+
+
+# =============================================================================
+# Allocation export
+# =============================================================================
+def export_allocations(allocations, filename, export_to='xlsx'):
+    """Write the allocations returned by `autoallocate()` to `filename` + '.' + `export_to`.
+
+    'csv' files are written by pandas in chunks, 'xlsx' files with openpyxl in write-only mode
+    (rows are streamed to the file without building styled cells in memory) and 'parquet' files
+    with pandas' Parquet engine (requires pyarrow or fastparquet).
+    """
+    if export_to == 'csv':
+        allocations.to_csv(filename + '.csv', index=False)
+    elif export_to == 'xlsx':
+        _write_xlsx(allocations, filename + '.xlsx')
+    elif export_to == 'parquet':
+        try:
+            allocations.to_parquet(filename + '.parquet', index=False)
+        except ImportError:
+            raise ImportError("Exporting to parquet requires pyarrow, which can be installed with "
+                              "`pip install pyarrow`.")
+    else:
+        raise ValueError("`export_to` must be 'xlsx', 'csv', 'parquet' or False.")
+
+
+def _write_xlsx(frame, path):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(frame.columns))
+    for row in frame.itertuples(index=False, name=None):
+        sheet.append(row)
+    workbook.save(path)
+
+
+# =============================================================================
+# Write-back of added events
+# =============================================================================
+def write_status(file, names, event_ids=None, name_col='Participant Name',
+                 status_col='Calendar_Event', status='Yes', id_col='Calendar_Event_ID',
+                 header_row=1, output=None, rows=None):
+    """Mark the participants whose events were added in the participants sheet, in one pass.
+
+    Parameters
+    ----------
+    file : str
+        Participants sheet ('.xlsx', '.xlsm' or '.csv') the events were read from.
+    names : list
+        Participants (entries of `name_col`) whose events were added.
+    event_ids : list
+        ID of the created event of each participant in `names`, written to `id_col`.
+    status_col : str
+        Column set to `status` for these participants, e.g., the 'Calendar_Event' column used
+        as `filter_column` in `extract_info()`. Created if missing, as is `id_col`. Set `id_col`
+        to None to only update the status.
+    header_row : int
+        The (1-based) row containing the column names, as in `preprocess_file()`.
+    rows : list
+        Sheet row (the 'Row' index of `preprocess_file()`) of each entry of `names`. If given,
+        only these rows are updated, each with its own event ID, instead of every row of the
+        participants in `names` (e.g. when participants have one row per session).
+    output : str
+        File to save the updated sheet to. Defaults to overwriting `file`.
+
+    Returns
+    -------
+    int
+        Number of rows updated.
+
+    Examples
+    --------
+    >>> results = autocalendar.add_event(service, ..., batch_size=50)
+    >>> added = [result['error'] is None for result in results]
+    >>> autocalendar.write_status('participants.xlsx', to_add['Participant Name'][added],
+    ...                           [result['id'] for result in results if result['error'] is None])
+    """
+    names = list(names)
+    event_ids = list(event_ids) if event_ids is not None else [None] * len(names)
+    if rows is not None:
+        added = {int(row): event_id for row, event_id in zip(rows, event_ids)}
+    else:
+        added = {str(name): event_id for name, event_id in zip(names, event_ids)}
+    output = output or file
+
+    extension = os.path.splitext(str(file))[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return _write_status_xlsx(file, output, added, name_col, status_col, status, id_col,
+                                  header_row, keep_vba=extension == '.xlsm', by_row=rows is not None)
+    elif extension == '.csv':
+        return _write_status_csv(file, output, added, name_col, status_col, status, id_col, header_row,
+                                 by_row=rows is not None)
+    raise ValueError("Statuses can only be written back to '.xlsx', '.xlsm' or '.csv' files.")
+
+
+def _write_status_xlsx(file, output, added, name_col, status_col, status, id_col, header_row,
+                       keep_vba=False, by_row=False):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, keep_vba=keep_vba)
+    sheet = workbook.worksheets[0]
+    header = [cell.value for cell in sheet[header_row]]
+    while header and header[-1] is None:
+        header.pop()
+    if name_col not in header:
+        raise ValueError(f"Column '{name_col}' not found in '{file}'.")
+
+    def column(name):  # 1-based column of `name`, appended to the header if missing
+        if name not in header:
+            header.append(name)
+            sheet.cell(row=header_row, column=len(header), value=name)
+        return header.index(name) + 1
+
+    name_position = header.index(name_col) + 1
+    status_position = column(status_col)
+    id_position = column(id_col) if id_col is not None else None
+
+    updated = 0
+    for (cell,) in sheet.iter_rows(min_row=header_row + 1, min_col=name_position, max_col=name_position):
+        key = cell.row if by_row else str(cell.value)
+        if cell.value is None or key not in added:
+            continue
+        sheet.cell(row=cell.row, column=status_position, value=status)
+        if id_position is not None:
+            sheet.cell(row=cell.row, column=id_position, value=added[key])
+        updated += 1
+
+    workbook.save(output)
+    return updated
+
+
+def _write_status_csv(file, output, added, name_col, status_col, status, id_col, header_row,
+                      by_row=False):
+    # Read as raw text so that rows above the header and all values are kept as they are
+    sheet = pd.read_csv(file, header=None, dtype=str, keep_default_na=False)
+    header = sheet.iloc[header_row - 1].tolist()
+    if name_col not in header:
+        raise ValueError(f"Column '{name_col}' not found in '{file}'.")
+
+    def column(name):
+        if name not in header:
+            header.append(name)
+            sheet[len(header) - 1] = ''
+            sheet.iloc[header_row - 1, len(header) - 1] = name
+        return header.index(name)
+
+    rows = sheet.index[header_row:]
+    keys = pd.Series(rows + 1, index=rows) if by_row else sheet.loc[rows, header.index(name_col)]
+    selected = rows[keys.isin(added).to_numpy()]
+
+    sheet.loc[selected, column(status_col)] = status
+    if id_col is not None:
+        sheet.loc[selected, column(id_col)] = keys[selected].map(added)
+
+    sheet.to_csv(output, header=False, index=False)
+    return len(selected)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .autocalendar import NO_ONE_ASSIGNED, _allocation_frame
+from .availability import AvailabilityMatrix, read_poll
+from .instrument import current
+from .matching import match_slots
+
+
+# =============================================================================
+# Incremental re-allocation
+# =============================================================================
+class IncrementalAllocation:
+    """One-slot-per-participant allocation that is updated, rather than recomputed, when new
+    poll responses arrive.
+
+    The allocation and the availability matrix it was made from are saved together with
+    `save()`. `update()` then compares an updated poll with them: participants keep their slot
+    as long as they are still available for it, and newcomers (or participants who lost their
+    slot) are placed with augmenting paths, taking a free slot if they can and otherwise moving
+    as few booked participants as possible. Only the changed assignments are returned.
+
+    Examples
+    --------
+    >>> import autocalendar
+    >>> allocation = autocalendar.IncrementalAllocation.from_poll('doodle_poll.xls')
+    >>> allocation.save('allocation.npz')
+    >>> # ... later, after more participants answered the poll
+    >>> allocation = autocalendar.IncrementalAllocation.load('allocation.npz')
+    >>> changes = allocation.update('doodle_poll_updated.xls')
+    >>> allocation.save('allocation.npz')
+    """
+
+    def __init__(self, matrix, assigned):
+        self.matrix = matrix
+        self.assigned = np.asarray(assigned, dtype=int)
+
+        if self.assigned.shape != (matrix.n_slots,):
+            raise ValueError("`assigned` must have one entry per slot.")
+        booked = self.assigned[self.assigned >= 0]
+        if len(np.unique(booked)) != len(booked):
+            raise ValueError("Incremental allocation requires at most one slot per participant "
+                             "(as allocated with 'single' or 'optimal').")
+        if not matrix.available[booked, np.flatnonzero(self.assigned >= 0)].all():
+            raise ValueError("Participants can only be assigned to slots they are available for.")
+
+    def __repr__(self):
+        return (f'IncrementalAllocation({(self.assigned >= 0).sum()} of '
+                f'{self.matrix.n_participants} participants allocated)')
+
+    @classmethod
+    def from_poll(cls, file, allocations=None):
+        """Start from a doodle poll file (or `AvailabilityMatrix`) and its `allocations`, as
+        returned by `autoallocate(..., export_to=False)` with 'single' or 'optimal'. If
+        `allocations` is None, participants are allocated with `match_slots()`.
+        """
+        matrix = file if isinstance(file, AvailabilityMatrix) else read_poll(file)
+        if allocations is None:
+            return cls(matrix, match_slots(matrix.available))
+
+        rows = {name: i for i, name in enumerate(matrix.participants)}
+        assigned = [rows.get(name, -1) for name in allocations['Participant']]
+        return cls(matrix, assigned)
+
+    def allocations(self):
+        """All current allocations, as returned by `autoallocate()`."""
+        return _allocation_frame(self.matrix, self.assigned)
+
+    # Persistence
+    def save(self, path):
+        """Save the allocation and its availability matrix to a '.npz' file."""
+        slots = self.matrix.slots
+        np.savez_compressed(path,
+                            participants=self.matrix.participants.astype(str),
+                            dates=slots['Date'].to_numpy(dtype='datetime64[ns]'),
+                            timeslots=slots['Timeslots'].to_numpy().astype(str),
+                            starts=slots['Start'].to_numpy(dtype='datetime64[ns]'),
+                            ends=slots['End'].to_numpy(dtype='datetime64[ns]'),
+                            packed=self.matrix.packed(),
+                            assigned=self.assigned)
+
+    @classmethod
+    def load(cls, path):
+        """Load an allocation saved with `save()`."""
+        with np.load(path) as content:
+            slots = pd.DataFrame({'Date': content['dates'],
+                                  'Timeslots': content['timeslots'].astype(object),
+                                  'Start': content['starts'],
+                                  'End': content['ends']})
+            matrix = AvailabilityMatrix.from_packed(content['participants'].astype(object), slots,
+                                                    content['packed'])
+            return cls(matrix, content['assigned'])
+
+    # Update
+    def update(self, file, move=True):
+        """Update the allocation with an updated poll (file or `AvailabilityMatrix`).
+
+        Participants and slots are matched by name and by start and end time. Assignments are
+        kept if the participant is still in the poll and available for the slot. Everyone else
+        is placed along the shortest augmenting path, fewest options first; with `move=False`,
+        only free slots are used and booked participants never move.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per participant whose assignment changed, with the 'Change' ('new', 'moved',
+            'unassigned' if their slot was lost and no other could be found, or 'removed' if
+            they left the poll), the new 'Date' and 'Timeslots' and the 'Previous Date' and
+            'Previous Timeslots'.
+        """
+        old = self.matrix
+        new = file if isinstance(file, AvailabilityMatrix) else read_poll(file)
+
+        # Carry over the assignments that still hold
+        rows = {name: i for i, name in enumerate(new.participants)}
+        columns = {key: i for i, key in enumerate(zip(new.slots['Start'], new.slots['End']))}
+        old_keys = list(zip(old.slots['Start'], old.slots['End']))
+        previous = {}  # participant name: old slot
+        assigned = np.full(new.n_slots, -1)
+        for slot in np.flatnonzero(self.assigned >= 0):
+            name = old.participants[self.assigned[slot]]
+            previous[name] = slot
+            row = rows.get(name, -1)
+            column = columns.get(old_keys[slot], -1)
+            if row >= 0 and column >= 0 and new.available[row, column]:
+                assigned[column] = row
+
+        # Place everyone else who is available for some slot
+        slot_of = np.full(new.n_participants, -1)
+        slot_of[assigned[assigned >= 0]] = np.flatnonzero(assigned >= 0)
+        adjacency = [np.flatnonzero(row).tolist() for row in new.available]
+        waiting = [participant for participant in np.flatnonzero(slot_of < 0) if adjacency[participant]]
+        waiting.sort(key=lambda participant: len(adjacency[participant]))
+        dead = set()
+        for participant in waiting:
+            _augment(participant, adjacency, slot_of, assigned, dead, move=move)
+
+        self.matrix, self.assigned = new, assigned
+        current().note('unallocated', new.participants[slot_of < 0].tolist())
+        return _changes(old, new, previous, slot_of)
+
+
+def _augment(root, adjacency, slot_of, assigned, dead, move=True):
+    """Assign `root` along the shortest augmenting path (breadth-first), moving the booked
+    participants on the path to their next slot. Returns whether `root` could be assigned.
+
+    Slots reached by a failed search cannot lead to a free slot, then or after later
+    augmentations, so they are added to `dead` and skipped by the next searches.
+    """
+    reached_from = {}  # slot: participant it was reached from
+    queue = deque([root])
+    while queue:
+        participant = queue.popleft()
+        for slot in adjacency[participant]:
+            if slot in reached_from or slot in dead:
+                continue
+            reached_from[slot] = participant
+            other = assigned[slot]
+            if other == -1:
+                # Shift every participant on the path to the slot it reached
+                while True:
+                    participant = reached_from[slot]
+                    slot_of[participant], slot = slot, slot_of[participant]
+                    assigned[slot_of[participant]] = participant
+                    if participant == root:
+                        return True
+            if move:
+                queue.append(other)
+
+    if move:  # without moves, the slots reached are only those of `root`
+        dead.update(reached_from)
+    return False
+
+
+def _changes(old, new, previous, slot_of):
+    """Participant-level changes between the `previous` (old) and the new assignments."""
+    old_labels = _slot_labels(old)
+    new_labels = _slot_labels(new)
+
+    records = []
+    for participant, name in enumerate(new.participants):
+        slot = slot_of[participant]
+        before = previous.get(name)
+        now = new_labels[slot] if slot >= 0 else None
+        then = old_labels[before] if before is not None else None
+        if now == then:
+            continue
+        change = 'new' if then is None else 'unassigned' if now is None else 'moved'
+        records.append((name, change) + (now or (NO_ONE_ASSIGNED, '')) + (then or ('', '')))
+
+    remaining = set(new.participants)
+    for name, before in previous.items():
+        if name not in remaining:
+            records.append((name, 'removed', NO_ONE_ASSIGNED, '') + old_labels[before])
+
+    return pd.DataFrame.from_records(records, columns=['Participant', 'Change', 'Date', 'Timeslots',
+                                                      'Previous Date', 'Previous Timeslots'])
+
+
+def _slot_labels(matrix):
+    return list(zip(matrix.slots['Date'].dt.strftime("%d/%m/%y"), matrix.slots['Timeslots']))
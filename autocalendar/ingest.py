@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import os.path
+
+import pandas as pd
+
+# Rows read at a time from CSV files
+CHUNKSIZE = 50000
+
+
+# =============================================================================
+# Streaming ingest of participant sheets
+# =============================================================================
+def read_participants(file, header_row=1, usecols=None, filter_column=None, select=None,
+                      chunksize=CHUNKSIZE):
+    """Read a participants sheet ('.xlsx', '.xls', '.csv' or '.parquet'), keeping only the
+    columns in `usecols` and the rows where `filter_column` equals `select`.
+
+    Columns and rows are dropped while the file is read, so memory stays proportional to the
+    selected data: '.xlsx' files are streamed row by row with openpyxl in read-only mode, CSV
+    files are read in chunks of `chunksize` rows and Parquet files are read with column
+    projection and a row filter (requires pyarrow). '.xls' files cannot be streamed and are
+    read whole before being filtered.
+
+    `header_row` is the (1-based) row containing the column names; rows above it are ignored.
+    Rows read from '.xlsx', '.xls' and '.csv' files are indexed by their (1-based) 'Row' in the
+    sheet, blank lines of CSV files not counted, so that `write_status()` can mark them.
+    """
+    if usecols is not None:
+        usecols = list(dict.fromkeys(usecols))
+        if filter_column is not None and filter_column not in usecols:
+            usecols.append(filter_column)
+    filtered = filter_column is not None and select is not None
+
+    extension = os.path.splitext(str(file))[1].lower()
+    if extension == '.csv':
+        chunks = pd.read_csv(file, header=header_row - 1, usecols=usecols, chunksize=chunksize)
+        participants = pd.concat([_select(chunk, filter_column, select) if filtered else chunk
+                                  for chunk in chunks])
+        return _sheet_rows(participants, header_row)
+
+    elif extension == '.parquet':
+        participants = pd.read_parquet(file, columns=usecols,
+                                       filters=[(filter_column, '==', select)] if filtered else None)
+        return participants.reset_index(drop=True)
+
+    elif extension in ('.xlsx', '.xlsm'):
+        return _read_xlsx(file, header_row, usecols, filter_column if filtered else None, select)
+
+    participants = pd.read_excel(file, header=header_row - 1, usecols=usecols)
+    if filtered:
+        participants = _select(participants, filter_column, select)
+    return _sheet_rows(participants, header_row)
+
+
+def _sheet_rows(participants, header_row=1):
+    """Index `participants`, read below `header_row` with a default index, by their sheet 'Row'."""
+    participants = participants.copy(deep=False)
+    participants.index = pd.Index(participants.index + header_row + 1, name='Row')
+    return participants
+
+
+def _select(participants, filter_column, select):
+    return participants[participants[filter_column] == select]
+
+
+def _read_xlsx(file, header_row, usecols, filter_column, select):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=header_row, values_only=True)
+        header = list(next(rows, ()))
+
+        if usecols is None:
+            usecols = [name for name in header if name is not None]
+        missing = [name for name in usecols if name not in header]
+        if missing:
+            raise ValueError(f"Columns not found in '{file}': {missing}")
+        positions = [header.index(name) for name in usecols]
+        filter_position = header.index(filter_column) if filter_column is not None else None
+
+        records, numbers = [], []
+        for number, row in enumerate(rows, start=header_row + 1):
+            if filter_position is not None and (filter_position >= len(row) or row[filter_position] != select):
+                continue
+            if all(value is None for value in row):
+                continue  # trailing empty rows
+            records.append([row[i] if i < len(row) else None for i in positions])
+            numbers.append(number)
+    finally:
+        workbook.close()
+
+    return pd.DataFrame(records, columns=usecols, index=pd.Index(numbers, name='Row', dtype='int64'))
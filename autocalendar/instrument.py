@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+
+# =============================================================================
+# Collectors
+# =============================================================================
+class Instrumentation:
+    """No-op collector, active by default. Subclass it (or use `Recorder`) to collect stage
+    timings, counts and API calls.
+    """
+
+    enabled = False
+
+    def stage(self, name):
+        """Context manager timing the stage `name`."""
+        return _NULL_STAGE
+
+    def record_stage(self, name, seconds):
+        pass
+
+    def count(self, name, **counts):
+        """Add counts (e.g. `rows=10`) to the stage `name`."""
+        pass
+
+    def api_call(self, method, seconds, error=None):
+        """Record a Calendar API call of `method` (e.g. 'events.insert') taking `seconds`."""
+        pass
+
+    def retry(self, method, n=1):
+        pass
+
+    def note(self, key, value):
+        """Record feedback otherwise printed, e.g. the participants that could not be allocated."""
+        pass
+
+
+class Recorder(Instrumentation):
+    """Collect per-stage wall time and counts, Calendar API calls, retries and latencies.
+
+    If `callback` is given, it is also called with a dictionary for every stage and API call as
+    they are recorded (e.g. to forward them to a logger or a metrics client).
+
+    Examples
+    --------
+    >>> import autocalendar
+    >>> with autocalendar.instrument() as recorder:
+    ...     autocalendar.autoallocate('doodle_poll.xls', export_to=False)
+    >>> recorder.summary()
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.stages = defaultdict(lambda: {'seconds': 0.0, 'runs': 0})
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.retries = Counter()
+        self.notes = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name]['seconds'] += seconds
+            self.stages[name]['runs'] += 1
+        self._emit({'type': 'stage', 'name': name, 'seconds': seconds})
+
+    def count(self, name, **counts):
+        with self._lock:
+            stage = self.stages[name]
+            for key, value in counts.items():
+                stage[key] = stage.get(key, 0) + value
+
+    def api_call(self, method, seconds, error=None):
+        with self._lock:
+            self.latencies[method].append(seconds)
+            if error is not None:
+                self.errors[method] += 1
+        self._emit({'type': 'api_call', 'method': method, 'seconds': seconds, 'error': error})
+
+    def retry(self, method, n=1):
+        with self._lock:
+            self.retries[method] += n
+
+    def note(self, key, value):
+        with self._lock:
+            self.notes[key] = value
+
+    def summary(self):
+        """Stages (time, runs and counts), API calls (count, errors, retries and latency
+        percentiles in milliseconds, per method) and notes, as a dictionary.
+        """
+        with self._lock:
+            api = {}
+            for method, latencies in self.latencies.items():
+                milliseconds = np.asarray(latencies) * 1000
+                p50, p90, p99 = np.percentile(milliseconds, [50, 90, 99])
+                api[method] = {'calls': len(latencies), 'errors': self.errors[method],
+                               'retries': self.retries[method], 'p50_ms': float(p50),
+                               'p90_ms': float(p90), 'p99_ms': float(p99),
+                               'max_ms': float(milliseconds.max())}
+            return {'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                    'api': api,
+                    'notes': dict(self.notes)}
+
+    def _emit(self, record):
+        if self.callback is not None:
+            self.callback(record)
+
+
+class _Stage:
+    def __init__(self, collector, name):
+        self.collector = collector
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.collector.record_stage(self.name, time.perf_counter() - self.start)
+
+    def count(self, **counts):
+        self.collector.count(self.name, **counts)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def count(self, **counts):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+_NOOP = Instrumentation()
+_current = contextvars.ContextVar('autocalendar_instrumentation', default=_NOOP)
+
+
+# =============================================================================
+# Activation
+# =============================================================================
+@contextlib.contextmanager
+def instrument(collector=None):
+    """Collect instrumentation within the block with `collector` (a new `Recorder` by default),
+    which is returned by the context manager.
+    """
+    collector = collector if collector is not None else Recorder()
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """The active collector (a no-op `Instrumentation` outside of `instrument()`)."""
+    return _current.get()
+
+
+def timed(name):
+    """Decorator recording each call of the function as the stage `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            collector = _current.get()
+            if not collector.enabled:
+                return function(*args, **kwargs)
+            with collector.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def execute(request, method, collector=None, **kwargs):
+    """Execute an API `request`, recording it as a call of `method` with its latency. Pass
+    `collector` explicitly from worker threads, which do not inherit the active one.
+    """
+    collector = collector if collector is not None else _current.get()
+    if not collector.enabled:
+        return request.execute(**kwargs)
+
+    start = time.perf_counter()
+    try:
+        response = request.execute(**kwargs)
+    except Exception as error:
+        collector.api_call(method, time.perf_counter() - start, error=error)
+        raise
+    collector.api_call(method, time.perf_counter() - start)
+    return response
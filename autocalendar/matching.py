@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+
+import numpy as np
+
+
+# =============================================================================
+# Maximum bipartite matching of participants to slots
+# =============================================================================
+def match_slots(available, costs=None):
+    """Assign at most one slot per participant and one participant per slot so that as many
+    participants as possible are allocated.
+
+    Parameters
+    ----------
+    available : np.ndarray
+        Boolean array of shape (n_participants, n_slots), e.g. `AvailabilityMatrix.available`.
+    costs : np.ndarray
+        Optional array of the same shape giving the cost of assigning a participant to a slot
+        (lower is preferred). Among all maximum matchings, the one with the lowest total cost
+        is returned. Requires scipy.
+
+    Returns
+    -------
+    np.ndarray
+        Index of the participant assigned to each slot, -1 where no one is assigned.
+        The result is deterministic.
+    """
+    available = np.asarray(available, dtype=bool)
+
+    if costs is not None:
+        return _min_cost_matching(available, np.asarray(costs, dtype=float))
+
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import maximum_bipartite_matching
+    except ImportError:
+        return hopcroft_karp(available)
+
+    # perm_type='row' gives, for each column (slot), the matched row (participant)
+    return maximum_bipartite_matching(csr_matrix(available), perm_type='row').astype(int)
+
+
+def _min_cost_matching(available, costs):
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        raise ImportError("Preference `costs` require scipy, which can be installed with "
+                          "`pip install scipy`.")
+
+    if costs.shape != available.shape:
+        raise ValueError("`costs` must have the same shape as `available`.")
+
+    # Unavailable pairs cost more than any full set of available pairs, so the cardinality of
+    # the matching is maximized first and the total cost second.
+    usable = np.where(available, costs - costs[available].min(initial=0), 0)
+    penalty = usable.sum() + 1
+    rows, cols = linear_sum_assignment(np.where(available, usable, penalty))
+
+    assigned = np.full(available.shape[1], -1)
+    matched = available[rows, cols]
+    assigned[cols[matched]] = rows[matched]
+    return assigned
+
+
+def hopcroft_karp(available):
+    """Pure Python Hopcroft–Karp matching, used when scipy is not installed.
+
+    Same input and output as `match_slots()`.
+    """
+    n_participants, n_slots = available.shape
+    adjacency = [np.flatnonzero(row).tolist() for row in available]
+
+    slot_of = [-1] * n_participants
+    participant_of = [-1] * n_slots
+
+    # Greedy initial matching removes most of the augmenting work
+    for participant, slots in enumerate(adjacency):
+        for slot in slots:
+            if participant_of[slot] == -1:
+                participant_of[slot] = participant
+                slot_of[participant] = slot
+                break
+
+    infinity = n_participants + 1
+    while True:
+        # Breadth-first search layering from free participants
+        layer = [infinity] * n_participants
+        queue = deque()
+        for participant in range(n_participants):
+            if slot_of[participant] == -1:
+                layer[participant] = 0
+                queue.append(participant)
+
+        found = False
+        while queue:
+            participant = queue.popleft()
+            for slot in adjacency[participant]:
+                other = participant_of[slot]
+                if other == -1:
+                    found = True
+                elif layer[other] == infinity:
+                    layer[other] = layer[participant] + 1
+                    queue.append(other)
+        if not found:
+            break
+
+        # Depth-first search for vertex-disjoint shortest augmenting paths
+        position = [0] * n_participants
+        for root in range(n_participants):
+            if slot_of[root] != -1:
+                continue
+            stack = [root]
+            path = []
+            while stack:
+                participant = stack[-1]
+                slots = adjacency[participant]
+                advanced = False
+                while position[participant] < len(slots):
+                    slot = slots[position[participant]]
+                    position[participant] += 1
+                    other = participant_of[slot]
+                    if other == -1:
+                        # Augment along the path
+                        path.append(slot)
+                        for p, s in zip(stack, path):
+                            slot_of[p] = s
+                            participant_of[s] = p
+                        stack = []
+                        advanced = True
+                        break
+                    if layer[other] == layer[participant] + 1:
+                        path.append(slot)
+                        stack.append(other)
+                        advanced = True
+                        break
+                if not advanced:
+                    layer[participant] = infinity  # dead end
+                    stack.pop()
+                    if path:
+                        path.pop()
+
+    return np.array(participant_of, dtype=int)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from dateutil.rrule import rrulestr
+
+# Format of event times as written by `create_event()`
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+# =============================================================================
+# Recurring series
+# =============================================================================
+def find_series(dates, min_length=2):
+    """Find the regular series in a list of dates (e.g. the sessions of one participant).
+
+    The interval is the most common gap between consecutive dates, and the series is anchored
+    on the dates lying on the most common position modulo that interval. Dates of the grid
+    without a session become exceptions; dates off the grid are left out of the series.
+
+    Returns
+    -------
+    tuple
+        (start, interval, count, exceptions, others): the first date, the interval in days
+        and number of occurrences of the series, the grid dates without a session, and the
+        dates not in the series. None if fewer than `min_length` dates fit a series, or if
+        the series would have as many exceptions as sessions.
+    """
+    dates = sorted(set(dates))
+    if len(dates) < max(min_length, 2):
+        return None
+
+    gaps = Counter((later - earlier).days for earlier, later in zip(dates, dates[1:]))
+    interval = min(gaps, key=lambda gap: (-gaps[gap], gap))  # most common, then shortest
+    if interval <= 0:
+        return None
+
+    residues = Counter((date - dates[0]).days % interval for date in dates)
+    residue = min(residues, key=lambda value: (-residues[value], value))
+    on_grid = [date for date in dates if (date - dates[0]).days % interval == residue]
+    if len(on_grid) < min_length:
+        return None
+
+    start = on_grid[0]
+    count = (on_grid[-1] - start).days // interval + 1
+    if count - len(on_grid) >= len(on_grid):
+        return None  # mostly gaps: not worth a series
+
+    sessions = set(on_grid)
+    exceptions = [start + timedelta(days=interval * k) for k in range(count)
+                  if start + timedelta(days=interval * k) not in sessions]
+    others = [date for date in dates if date not in sessions]
+    return start, interval, count, exceptions, others
+
+
+def recurrence_rule(interval, count, exceptions=(), start=None, timezone=None):
+    """'recurrence' lines of an event repeating every `interval` days for `count` occurrences,
+    except on the datetimes in `exceptions` (local to `timezone`, with `start`'s time of day).
+    """
+    if interval % 7 == 0:
+        rule = 'RRULE:FREQ=WEEKLY'
+        interval //= 7
+    else:
+        rule = 'RRULE:FREQ=DAILY'
+    if interval > 1:
+        rule += f';INTERVAL={interval}'
+    lines = [rule + f';COUNT={count}']
+
+    if exceptions:
+        times = ','.join(datetime.combine(date, start.time()).strftime('%Y%m%dT%H%M%S')
+                         for date in exceptions)
+        lines.append(f'EXDATE;TZID={timezone}:{times}' if timezone else f'EXDATE:{times}')
+    return lines
+
+
+def collapse_series(events, calendar_id='primary', keys=None, min_length=2):
+    """Replace events repeating at a regular interval by one recurring event each.
+
+    Events (as created by `create_event()`) are grouped by key (e.g. the participant's name,
+    all events sharing one key if `keys` is None), calendar and content, i.e., everything but
+    the date. Within each group, the series found by `find_series()` is sent as a single event
+    with an RRULE and EXDATEs for the missing sessions; sessions off the series (e.g. one moved
+    to another weekday) stay separate events.
+
+    Returns
+    -------
+    tuple
+        The new events, their calendar ID(s) (a single ID if all are the same) and, for each
+        original event, the index of the new event that covers it.
+    """
+    calendars = [calendar_id] * len(events) if isinstance(calendar_id, str) else list(calendar_id)
+    keys = [None] * len(events) if keys is None else list(keys)
+
+    groups = {}  # group: {date: original indices}
+    loose = []  # events that cannot be part of a series
+    for i, event in enumerate(events):
+        start, end = _local_time(event['start']), _local_time(event['end'])
+        if start is None or end is None or 'recurrence' in event:
+            loose.append(i)
+            continue
+        content = {name: value for name, value in event.items() if name not in ('start', 'end', 'id')}
+        group = (keys[i], calendars[i], start.time(), end - start, event['start'].get('timeZone'),
+                 repr(sorted(content.items())))
+        groups.setdefault(group, {}).setdefault(start.date(), []).append(i)
+
+    new_events, new_calendars = [], []
+    covered = [None] * len(events)
+
+    def add(body, calendar, indices):
+        for i in indices:
+            covered[i] = len(new_events)
+        new_events.append(body)
+        new_calendars.append(calendar)
+
+    for (_, calendar, _, _, timezone, _), by_date in groups.items():
+        # Only the first event of each date can be part of the series
+        series = find_series(by_date, min_length=min_length)
+        in_series = set()
+        if series is not None:
+            first, interval, count, exceptions, others = series
+            in_series = set(by_date) - set(others)
+            master = dict(events[by_date[first][0]])
+            master['recurrence'] = recurrence_rule(interval, count, exceptions,
+                                                   start=_local_time(master['start']), timezone=timezone)
+            add(master, calendar, [indices[0] for date, indices in by_date.items() if date in in_series])
+        for date, indices in by_date.items():
+            for i in (indices[1:] if date in in_series else indices):
+                add(events[i], calendar, [i])
+
+    for i in loose:
+        add(events[i], calendars[i], [i])
+
+    if len(set(new_calendars)) <= 1:
+        new_calendars = new_calendars[0] if new_calendars else calendar_id
+    return new_events, new_calendars, covered
+
+
+# =============================================================================
+# Occurrences
+# =============================================================================
+def occurrences(event, timezone='Asia/Singapore'):
+    """Start and end (UTC) of each occurrence of a recurring event, e.g. as created by
+    `collapse_series()`, for free/busy checks of local backends.
+
+    The 'recurrence' lines are expanded from the event's local start time in its 'timeZone' (or
+    `timezone`): RRULEs with a COUNT or UNTIL, and EXDATEs in local time, in UTC or in another
+    TZID. Events without 'recurrence' have a single occurrence.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per occurrence with its UTC 'Start' and 'End', sorted by start.
+
+    Raises
+    ------
+    ValueError
+        If the event times carry no local time and 'timeZone', or the recurrence is unbounded
+        or uses other properties (e.g. RDATE).
+    """
+    zone = event['start'].get('timeZone', timezone)
+    start, end = _local_time(event['start']), _local_time(event['end'])
+    if start is None or end is None:
+        raise ValueError("Only events with local times and a 'timeZone' (as created by `create_event()`) "
+                         "can be expanded.")
+
+    rules, exceptions = [], set()
+    for line in event.get('recurrence', []):
+        name, _, value = line.partition(':')
+        name, *parameters = name.split(';')
+        parameters = dict(parameter.partition('=')[::2] for parameter in parameters)
+        if name.upper() == 'RRULE':
+            if 'COUNT=' not in value.upper() and 'UNTIL=' not in value.upper():
+                raise ValueError(f"Recurrence '{line}' has no COUNT or UNTIL and cannot be expanded.")
+            value = ';'.join(_local_until(part, zone) for part in value.split(';'))
+            rules.append(rrulestr(value, dtstart=start))
+        elif name.upper() == 'EXDATE':
+            exceptions.update(_local_exception(text, parameters.get('TZID', zone), zone)
+                              for text in value.split(','))
+        else:
+            raise ValueError(f"Recurrence property '{name}' is not supported.")
+
+    starts = [start] if not rules else sorted({occurrence for rule in rules for occurrence in rule
+                                               if occurrence not in exceptions
+                                               and occurrence.date() not in exceptions})
+    local = pd.DatetimeIndex(starts)
+    # Ambiguous local times (when clocks go back) are taken as the first of the two
+    utc_starts = local.tz_localize(zone, ambiguous=np.ones(len(local), dtype=bool),
+                                   nonexistent='shift_forward').tz_convert('UTC')
+    utc_ends = (local + (end - start)).tz_localize(zone, ambiguous=np.ones(len(local), dtype=bool),
+                                                   nonexistent='shift_forward').tz_convert('UTC')
+    return pd.DataFrame({'Start': utc_starts, 'End': utc_ends})
+
+
+def _local_until(part, zone):
+    """RRULE part with an UTC 'UNTIL=...Z' converted to local time, as dateutil expects for
+    local start times."""
+    name, _, value = part.partition('=')
+    if name.upper() != 'UNTIL' or not value.upper().endswith('Z'):
+        return part
+    until = pd.Timestamp(value[:-1], tz='UTC').tz_convert(zone).tz_localize(None)
+    return 'UNTIL=' + until.strftime('%Y%m%dT%H%M%S')
+
+
+def _local_exception(text, text_zone, zone):
+    """EXDATE value as a local datetime in `zone`, or a date for all-day exceptions."""
+    if len(text) == 8:  # VALUE=DATE
+        return datetime.strptime(text, '%Y%m%d').date()
+    if text.upper().endswith('Z'):
+        timestamp = pd.Timestamp(text[:-1], tz='UTC')
+    else:
+        timestamp = pd.Timestamp(text).tz_localize(text_zone) if text_zone != zone else pd.Timestamp(text)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert(zone).tz_localize(None)
+    return timestamp.to_pydatetime()
+
+
+def _local_time(time):
+    try:
+        return datetime.strptime(time['dateTime'], _TIME_FORMAT)
+    except (KeyError, ValueError):  # all-day events or times with an offset
+        return None
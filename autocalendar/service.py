@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os.path
+import pickle
+import threading
+
+from googleapiclient.discovery import build, build_from_document
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# Built services, keyed by token and client paths
+_services = {}
+_services_lock = threading.Lock()
+
+
+# =============================================================================
+# Credentials
+# =============================================================================
+def load_credentials(token_path, client_path, scopes=SCOPES):
+    """Load the pickled credentials in `token_path`, refreshing them or running the OAuth flow
+    with `client_path` (client_secret.json) if they are missing or no longer valid. The token
+    is only written back when it changed.
+    """
+    # Token generated after first time code is run.
+    if os.path.exists(token_path):
+        with open(token_path, 'rb') as token:
+            credentials = pickle.load(token)
+    else:
+        credentials = None
+
+    # If there are no (valid) credentials available, log in and enter authorization code manually
+    if not credentials or not credentials.valid:
+        if credentials and credentials.expired and credentials.refresh_token:
+            credentials.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(client_path, scopes=scopes)
+            credentials = flow.run_local_server(port=0)
+
+        # Save the credentials for the next run
+        _save_token(credentials, token_path)
+
+    return credentials
+
+
+class CredentialsHolder:
+    """Thread-safe holder that refreshes credentials `margin` seconds before they expire, so
+    that requests never wait on a refresh of already expired credentials.
+
+    Call `get()` before a unit of work, or `start()` to refresh in a background thread for
+    long-running processes. Refreshed tokens are saved to `token_path` if given.
+    """
+
+    def __init__(self, credentials, token_path=None, margin=300):
+        self.credentials = credentials
+        self.token_path = token_path
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def needs_refresh(self):
+        expiry = getattr(self.credentials, 'expiry', None)
+        if expiry is None:
+            return not self.credentials.valid
+        return expiry - datetime.datetime.utcnow() < datetime.timedelta(seconds=self.margin)
+
+    def refresh(self, force=False):
+        """Refresh the credentials if they expire within `margin` seconds (or if `force`)."""
+        with self._lock:
+            if force or self.needs_refresh():
+                self.credentials.refresh(Request())
+                if self.token_path is not None:
+                    _save_token(self.credentials, self.token_path)
+        return self.credentials
+
+    def get(self):
+        """Return the credentials, refreshed first if they are about to expire."""
+        if self.needs_refresh():
+            self.refresh()
+        return self.credentials
+
+    def start(self):
+        """Refresh proactively in a daemon thread until `stop()` is called."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            expiry = getattr(self.credentials, 'expiry', None)
+            if expiry is None:
+                return  # credentials that do not expire
+            wait = (expiry - datetime.datetime.utcnow()).total_seconds() - self.margin
+            if self._stop.wait(max(wait, 0)):
+                return
+            try:
+                self.refresh()
+            except Exception:
+                self._stop.wait(30)  # e.g. network down, try again shortly
+            else:
+                if self.needs_refresh():
+                    self._stop.wait(30)  # expiry did not move forward, do not spin
+
+
+def _save_token(credentials, token_path):
+    with open(token_path, 'wb') as token:
+        pickle.dump(credentials, token)
+
+
+# =============================================================================
+# Service factory
+# =============================================================================
+def build_service(credentials, discovery_path=None):
+    """Build the Calendar v3 resource without fetching the discovery document over the
+    network: from the JSON document in `discovery_path` if given, otherwise from the copy
+    shipped with googleapiclient.
+    """
+    if discovery_path is not None:
+        with open(discovery_path) as document:
+            return build_from_document(document.read(), credentials=credentials)
+    return build("calendar", "v3", credentials=credentials, static_discovery=True)
+
+
+def get_service(token_path, client_path, discovery_path=None):
+    """Return the Calendar resource for these credentials, building it only on the first call
+    in this process. The credentials are kept in a `CredentialsHolder` (see `get_holder()`)
+    whose background thread refreshes them ahead of expiry, so long imports using the service
+    never stall on an inline refresh. The thread is stopped by `clear_services()`.
+    """
+    key = (os.path.abspath(token_path), os.path.abspath(client_path))
+    with _services_lock:
+        if key not in _services:
+            holder = CredentialsHolder(load_credentials(token_path, client_path), token_path=token_path)
+            _services[key] = (build_service(holder.credentials, discovery_path=discovery_path), holder)
+            holder.start()
+        service, holder = _services[key]
+
+    holder.get()  # refresh ahead of expiry
+    return service
+
+
+def get_holder(token_path, client_path):
+    """Return the `CredentialsHolder` of a service built by `get_service()`."""
+    key = (os.path.abspath(token_path), os.path.abspath(client_path))
+    with _services_lock:
+        return _services[key][1]
+
+
+def clear_services():
+    """Forget all services built by `get_service()` and stop refreshing their credentials."""
+    with _services_lock:
+        for _, holder in _services.values():
+            holder.stop()
+        _services.clear()
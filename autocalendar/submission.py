@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .instrument import current, execute
+
+# Maximum number of calls allowed in one Calendar API batch request
+MAX_BATCH_SIZE = 50
+
+# HTTP statuses worth retrying (403 only when it is a rate limit, see `is_retryable()`)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+# =============================================================================
+# Batched insertion
+# =============================================================================
+def insert_events(service, events, calendar_id='primary', batch_size=MAX_BATCH_SIZE):
+    """Insert events into google calendar using HTTP batch requests of up to `batch_size`
+    (at most 50) inserts each, i.e., one round trip per batch instead of one per event.
+
+    `calendar_id` can also be a list with the calendar ID of each event. A failing event does
+    not abort the others. Returns one result per event, in the same order
+    as `events`, as a dictionary with the created event 'id' (None on failure) and the 'error'
+    raised for that event (None on success).
+
+    Examples
+    --------
+    >>> results = insert_events(service, events, calendar_id='primary')
+    >>> failed = [result for result in results if result['error'] is not None]
+    """
+    return execute_requests(service, _inserts(service, events, calendar_id), len(events),
+                            batch_size=batch_size)
+
+
+# =============================================================================
+# Concurrent, rate-limited submission
+# =============================================================================
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second on average, with bursts of up
+    to `capacity` calls.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("`rate` must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` calls may be issued."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve the tokens now and wait for the deficit outside the lock
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def submit_events(service, events, calendar_id='primary', workers=4, qps=10,
+                  batch_size=1, max_retries=5, http_factory=None):
+    """Insert events concurrently from a bounded thread pool, within the project's quota.
+
+    Parameters
+    ----------
+    service : Resource
+        The resource built from the googleapiclient, e.g., service = autocalendar.setup_oath()
+    events : list
+        Event bodies, e.g. as created by `create_event()`.
+    calendar_id : str or list
+        ID of the calendar to insert into, or a list with the calendar ID of each event.
+    workers : int
+        Number of concurrent workers. Each worker sends its requests over its own authorized
+        HTTP object, created with `http_factory(service)`. By default, this is an
+        `AuthorizedHttp` bound to the credentials of `service`.
+    qps : float
+        Queries per second allowed by the project's quota, enforced with a token bucket. Calls
+        inside a batch request count individually.
+    batch_size : int
+        Number of inserts sent per request. Values above 1 use HTTP batch requests (at most 50).
+    max_retries : int
+        Number of times an event is retried after a retryable error (403 rate limit, 429, 5xx
+        or connection errors), with exponential backoff and jitter. Events without an 'id' are
+        given one before the first attempt, so that an insert that reached the server before
+        its response was lost is not duplicated: a retry answered with 409 (the ID exists)
+        counts as a success.
+
+    Returns
+    -------
+    list
+        One dictionary per event, in the same order as `events`, with the created event 'id',
+        the 'error' of the last attempt (None on success) and the number of 'retries'.
+    """
+    if workers < 1:
+        raise ValueError("`workers` must be at least 1.")
+
+    events = [event if event.get('id') else dict(event, id=_new_id()) for event in events]
+    return execute_requests(service, _inserts(service, events, calendar_id), len(events),
+                            batch_size=batch_size, workers=workers, qps=qps, max_retries=max_retries,
+                            http_factory=http_factory, ids=[event['id'] for event in events])
+
+
+def execute_requests(service, request, n, batch_size=MAX_BATCH_SIZE, workers=None, qps=10,
+                     max_retries=5, http_factory=None, ids=None, method='events.insert'):
+    """Execute `n` Calendar API calls, built by `request(i)` (e.g. `service.events().patch(...)`
+    for the i-th event), in HTTP batch requests of `batch_size` calls.
+
+    Batches are sent one after the other, or, if `workers` is set, concurrently within `qps`
+    queries per second and with retries, as in `submit_events()`. `ids` are the event IDs set
+    in the bodies of inserts, so that a retry answered with 409 counts as a success. `method`
+    names the calls in the instrumentation.
+
+    Returns
+    -------
+    list
+        One dictionary per call with the 'id' of the event in the response (None for responses
+        without one, e.g. deletions) and the 'error' raised for it (None on success), and the
+        number of 'retries' if `workers` is set.
+    """
+    _check_batch_size(batch_size)
+    chunks = [range(start, min(start + batch_size, n)) for start in range(0, n, batch_size)]
+    if workers is None:
+        results = [{'id': None, 'error': None} for _ in range(n)]
+        for indices in chunks:
+            _send(service, request, indices, results, method=method)
+        return results
+
+    if http_factory is None:
+        http_factory = _authorized_http
+    bucket = TokenBucket(qps)
+    local = threading.local()
+    results = [{'id': None, 'error': None, 'retries': 0} for _ in range(n)]
+    collector = current()  # worker threads do not inherit it
+
+    def run(indices):
+        if not hasattr(local, 'http'):
+            local.http = http_factory(service)
+
+        pending = list(indices)
+        for attempt in range(max_retries + 1):
+            bucket.acquire(len(pending))
+            failed = _send(service, request, pending, results, http=local.http, collector=collector,
+                           method=method, ids=ids if attempt > 0 else None)
+            if not failed or attempt == max_retries:
+                return
+            for i in failed:
+                results[i]['retries'] += 1
+            collector.retry(method, len(failed))
+            time.sleep(backoff(attempt, retry_after=max(_retry_after(results[i]['error'])
+                                                        for i in failed)))
+            pending = failed
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(run, chunks))
+
+    return results
+
+
+def backoff(attempt, base=0.5, cap=32, retry_after=0):
+    """Seconds to wait before retry number `attempt` (starting at 0): exponential backoff with
+    full jitter, but never less than the server's `retry_after`.
+    """
+    return max(retry_after, random.uniform(0, min(cap, base * 2 ** attempt)))
+
+
+def is_retryable(error):
+    """Whether a failed call should be retried: rate limits, server errors and dropped
+    connections.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+
+    status = _status(error)
+    if status is None:
+        return False
+    if status == 403:  # 403 is also used for permission errors
+        content = getattr(error, 'content', b'') or b''
+        if isinstance(content, str):
+            content = content.encode()
+        return b'ateLimitExceeded' in content  # rateLimitExceeded, userRateLimitExceeded
+    return status in RETRYABLE_STATUSES
+
+
+# =============================================================================
+# Internals
+# =============================================================================
+def _check_batch_size(batch_size):
+    if not 0 < batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"`batch_size` must be between 1 and {MAX_BATCH_SIZE}.")
+
+
+def _send(service, request, indices, results, http=None, collector=None, method='events.insert',
+          ids=None):
+    """Execute the calls `request(i)` for `indices` in one request (a batch request if more
+    than one) and store the outcome in `results`. Returns the indices that failed with a
+    retryable error.
+
+    If the `ids` of retried inserts are given, a 409 means that an earlier attempt created the
+    event even though its response was lost, and is recorded as a success.
+    """
+    execute_kwargs = {} if http is None else {'http': http}
+    recorded = set()
+
+    def record(i, response, exception):
+        recorded.add(i)
+        result = results[i]
+        if ids is not None and exception is not None and _status(exception) == 409:
+            exception, response = None, {'id': ids[i]}
+        result['error'] = exception
+        if exception is None:
+            result['id'] = response.get('id') if isinstance(response, dict) else None
+
+    indices = list(indices)
+    if len(indices) == 1:
+        i = indices[0]
+        try:
+            response = execute(request(i), method, collector=collector, **execute_kwargs)
+        except Exception as error:
+            record(i, None, error)
+        else:
+            record(i, response, None)
+    else:
+        batch = service.new_batch_http_request(
+            callback=lambda request_id, response, exception: record(int(request_id), response, exception))
+        for i in indices:
+            batch.add(request(i), request_id=str(i))
+        try:
+            execute(batch, 'batch', collector=collector, **execute_kwargs)
+        except Exception as error:  # the whole batch failed, e.g. connection error
+            for i in indices:
+                if i not in recorded:
+                    results[i]['error'] = error
+
+    return [i for i in indices if results[i]['error'] is not None and is_retryable(results[i]['error'])]
+
+
+def _inserts(service, events, calendar_id):
+    """Builder of the insert call of each event, for `execute_requests()`."""
+    return lambda i: service.events().insert(calendarId=_calendar(calendar_id, i), body=events[i])
+
+
+def _calendar(calendar_id, i):
+    """Calendar of event `i`: `calendar_id` is either one ID for all events or one ID per event."""
+    return calendar_id if isinstance(calendar_id, str) else calendar_id[i]
+
+
+def _new_id():
+    """Random event ID valid in google calendar (base32hex characters)."""
+    return uuid.uuid4().hex
+
+
+def _status(error):
+    """HTTP status of a failed call, None if it has none (e.g. a dropped connection)."""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return int(status) if status is not None else None
+
+
+def _retry_after(error):
+    try:
+        return float(error.resp.get('retry-after', 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def _authorized_http(service):
+    """A new authorized HTTP object for the credentials of `service`, as httplib2 connections
+    cannot be shared between threads. Returns None if `service` has no credentials attached.
+    """
+    credentials = getattr(getattr(service, '_http', None), 'credentials', None)
+    if credentials is None:
+        return None
+
+    import google_auth_httplib2
+    import httplib2
+
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
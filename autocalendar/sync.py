@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import sqlite3
+import time
+
+from .instrument import execute
+from .submission import MAX_BATCH_SIZE, _status, execute_requests
+
+
+# =============================================================================
+# Deterministic event IDs and content hashes
+# =============================================================================
+def event_id(*parts):
+    """Deterministic google calendar event ID for e.g. a (participant, session) pair.
+
+    Event IDs may only use lowercase letters a-v and digits (base32hex), which hexadecimal
+    digests satisfy.
+    """
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'ac' + digest
+
+
+def content_hash(event):
+    """Hash of an event body, used to detect rows whose details changed."""
+    return hashlib.sha1(json.dumps(event, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+# =============================================================================
+# Ledger of events already pushed to google calendar
+# =============================================================================
+class SyncLedger:
+    """Local SQLite record of the events pushed to each calendar, per session.
+
+    Examples
+    --------
+    >>> with SyncLedger('sync.db') as ledger:
+    ...     sync_events(service, events, keys=names, ledger=ledger, session='Session 1')
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            'calendar_id TEXT, session TEXT, key TEXT, event_id TEXT, hash TEXT, updated REAL, '
+            'PRIMARY KEY (calendar_id, session, key))')
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def entries(self, calendar_id, session):
+        """Recorded events of a session as {key: (event_id, hash)}."""
+        rows = self.connection.execute(
+            'SELECT key, event_id, hash FROM events WHERE calendar_id = ? AND session = ?',
+            (calendar_id, session))
+        return {key: (event_id, digest) for key, event_id, digest in rows}
+
+    def record(self, calendar_id, session, key, event_id, digest):
+        self.connection.execute('INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?)',
+                                (calendar_id, session, key, event_id, digest, time.time()))
+
+    def remove(self, calendar_id, session, key):
+        self.connection.execute('DELETE FROM events WHERE calendar_id = ? AND session = ? AND key = ?',
+                                (calendar_id, session, key))
+
+    def commit(self):
+        self.connection.commit()
+
+
+# =============================================================================
+# Incremental sync
+# =============================================================================
+def plan_sync(events, keys, ledger, calendar_id='primary', session='', delete_missing=True):
+    """Compare events with the ledger without calling the API.
+
+    Returns a dictionary with the events to 'insert' and 'patch' (lists of
+    (key, event_id, body, hash)), the events to 'delete' (list of (key, event_id)) and the
+    number of 'unchanged' events.
+    """
+    keys = [str(key) for key in keys]
+    if len(set(keys)) != len(keys):
+        raise ValueError("Keys (e.g. participant names) must be unique within a session.")
+
+    recorded = ledger.entries(calendar_id, session)
+    plan = {'insert': [], 'patch': [], 'delete': [], 'unchanged': 0}
+
+    for key, event in zip(keys, events):
+        digest = content_hash(event)
+        if key not in recorded:
+            plan['insert'].append((key, event_id(key, session), event, digest))
+        elif recorded[key][1] != digest:
+            plan['patch'].append((key, recorded[key][0], event, digest))
+        else:
+            plan['unchanged'] += 1
+
+    if delete_missing:
+        current = set(keys)
+        plan['delete'] = [(key, recorded_id) for key, (recorded_id, _) in recorded.items()
+                          if key not in current]
+
+    return plan
+
+
+def sync_events(service, events, keys, ledger, calendar_id='primary', session='',
+                delete_missing=True, batch_size=MAX_BATCH_SIZE, workers=None, qps=10):
+    """Push only new, changed and removed events to google calendar.
+
+    Each event is identified by its key (e.g. the participant's name) within `session` (e.g.
+    the event name) and gets a deterministic event ID. New events are inserted, events whose
+    content changed since the last sync are patched and, if `delete_missing`, events of the
+    session that are no longer listed are deleted. Re-running with the same events makes no
+    write calls.
+
+    Inserts, patches and deletions are sent in HTTP batch requests of `batch_size` calls or, if
+    `workers` is set, concurrently within `qps` queries per second and with retries (see
+    `execute_requests()`). Each successful call is recorded in the ledger; a failing call does
+    not abort the others and is tried again by the next sync.
+
+    `ledger` can be a `SyncLedger` or the path of its SQLite file. Returns the number of
+    'inserted', 'patched', 'deleted', 'unchanged' and 'failed' events.
+    """
+    if not isinstance(ledger, SyncLedger):
+        with SyncLedger(ledger) as opened:
+            return sync_events(service, events, keys, opened, calendar_id=calendar_id,
+                               session=session, delete_missing=delete_missing,
+                               batch_size=batch_size, workers=workers, qps=qps)
+
+    plan = plan_sync(events, keys, ledger, calendar_id=calendar_id, session=session,
+                     delete_missing=delete_missing)
+    options = {'batch_size': batch_size, 'workers': workers, 'qps': qps}
+    events_api = service.events()
+    counts = {'inserted': 0, 'patched': 0, 'deleted': 0, 'unchanged': plan['unchanged'], 'failed': 0}
+
+    try:
+        inserts = plan['insert']
+        results = execute_requests(
+            service, lambda i: events_api.insert(calendarId=calendar_id, body=dict(inserts[i][2], id=inserts[i][1])),
+            len(inserts), ids=[new_id for _, new_id, _, _ in inserts], method='events.insert', **options)
+        # Already in the calendar (e.g. the ledger was lost): overwrite them
+        existing = [i for i, result in enumerate(results) if _status(result['error']) == 409]
+        updates = execute_requests(
+            service, lambda n: events_api.update(calendarId=calendar_id, eventId=inserts[existing[n]][1],
+                                                 body=dict(inserts[existing[n]][2], id=inserts[existing[n]][1])),
+            len(existing), method='events.update', **options)
+        for n, i in enumerate(existing):
+            results[i] = updates[n]
+        for (key, new_id, _, digest), result in zip(inserts, results):
+            if result['error'] is None:
+                ledger.record(calendar_id, session, key, new_id, digest)
+                counts['inserted'] += 1
+            else:
+                counts['failed'] += 1
+
+        patches = plan['patch']
+        results = execute_requests(
+            service, lambda i: events_api.patch(calendarId=calendar_id, eventId=patches[i][1], body=patches[i][2]),
+            len(patches), method='events.patch', **options)
+        for (key, existing_id, _, digest), result in zip(patches, results):
+            if result['error'] is None:
+                ledger.record(calendar_id, session, key, existing_id, digest)
+                counts['patched'] += 1
+            else:
+                counts['failed'] += 1
+
+        deletions = plan['delete']
+        results = execute_requests(
+            service, lambda i: events_api.delete(calendarId=calendar_id, eventId=deletions[i][1]),
+            len(deletions), method='events.delete', **options)
+        for (key, _), result in zip(deletions, results):
+            if result['error'] is None or _status(result['error']) in (404, 410):  # already deleted
+                ledger.remove(calendar_id, session, key)
+                counts['deleted'] += 1
+            else:
+                counts['failed'] += 1
+    finally:
+        ledger.commit()  # keep track of what was pushed, even if a call failed
+
+    return counts
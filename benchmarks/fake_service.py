@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""In-process stand-in for the Calendar v3 resource built by googleapiclient.
+
+Supports the calls autocalendar makes (events insert/patch/update/delete/list,
+calendarList list with pagination, freebusy query and batch requests) without any network
+access, and counts them in `calls`.
+"""
+import itertools
+import threading
+from collections import Counter
+
+import pandas as pd
+
+
+class FakeRequest:
+    def __init__(self, function, *args):
+        self._function = function
+        self._args = args
+
+    def execute(self, http=None, num_retries=0):
+        return self._function(*self._args)
+
+
+class FakeBatch:
+    def __init__(self, service, callback=None):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request, callback or self._callback, request_id))
+
+    def execute(self, http=None):
+        self._service._count('batch')
+        for request, callback, request_id in self._requests:
+            try:
+                response, error = request.execute(), None
+            except Exception as exception:
+                response, error = None, exception
+            if callback is not None:
+                callback(request_id, response, error)
+
+
+class FakeService:
+    """Fake Calendar service holding events in memory.
+
+    Parameters
+    ----------
+    calendars : list
+        Calendar names to list in `calendarList()`, in addition to 'primary'.
+    page_size : int
+        Number of calendars per page of `calendarList().list()`.
+    """
+
+    def __init__(self, calendars=(), page_size=100):
+        self.calendars = [{'id': 'primary', 'summary': 'primary'}] + [
+            {'id': f'calendar{i}@group.calendar.google.com', 'summary': name}
+            for i, name in enumerate(calendars)]
+        self.page_size = page_size
+        self.store = {}
+        self.calls = Counter()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    # Resources
+    def events(self):
+        return _Events(self)
+
+    def calendarList(self):
+        return _CalendarList(self)
+
+    def freebusy(self):
+        return _FreeBusy(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+class _Events:
+    def __init__(self, service):
+        self._service = service
+
+    def insert(self, calendarId, body, **kwargs):
+        def run():
+            service = self._service
+            service._count('events.insert')
+            with service._lock:
+                event = dict(body)
+                event.setdefault('id', f'fake{next(service._ids)}')
+                service.store[(calendarId, event['id'])] = event
+            return event
+        return FakeRequest(run)
+
+    def update(self, calendarId, eventId, body, **kwargs):
+        def run():
+            self._service._count('events.update')
+            self._service.store[(calendarId, eventId)] = dict(body, id=eventId)
+            return self._service.store[(calendarId, eventId)]
+        return FakeRequest(run)
+
+    def patch(self, calendarId, eventId, body, **kwargs):
+        def run():
+            self._service._count('events.patch')
+            self._service.store[(calendarId, eventId)].update(body)
+            return self._service.store[(calendarId, eventId)]
+        return FakeRequest(run)
+
+    def delete(self, calendarId, eventId, **kwargs):
+        def run():
+            self._service._count('events.delete')
+            self._service.store.pop((calendarId, eventId), None)
+            return ''
+        return FakeRequest(run)
+
+    def list(self, calendarId, **kwargs):
+        def run():
+            self._service._count('events.list')
+            items = [event for (calendar, _), event in self._service.store.items() if calendar == calendarId]
+            return {'items': items}
+        return FakeRequest(run)
+
+
+class _CalendarList:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, pageToken=None, **kwargs):
+        def run():
+            service = self._service
+            service._count('calendarList.list')
+            start = int(pageToken or 0)
+            page = {'items': service.calendars[start:start + service.page_size]}
+            if start + service.page_size < len(service.calendars):
+                page['nextPageToken'] = str(start + service.page_size)
+            return page
+        return FakeRequest(run)
+
+
+class _FreeBusy:
+    def __init__(self, service):
+        self._service = service
+
+    def query(self, body):
+        def run():
+            service = self._service
+            service._count('freebusy.query')
+            calendars = {}
+            for item in body['items']:
+                busy = [{'start': _utc(event['start']), 'end': _utc(event['end'])}
+                        for (calendar, _), event in service.store.items() if calendar == item['id']]
+                calendars[item['id']] = {'busy': busy}
+            return {'calendars': calendars}
+        return FakeRequest(run)
+
+
+def _utc(time):
+    """RFC3339 UTC string of an event's start or end, as returned by the free/busy API."""
+    timestamp = pd.Timestamp(time['dateTime'])
+    if timestamp.tz is None:
+        timestamp = timestamp.tz_localize(time.get('timeZone', 'UTC'))
+    return timestamp.tz_convert('UTC').strftime('%Y-%m-%dT%H:%M:%SZ')
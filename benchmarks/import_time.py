@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Import-time regression benchmark.
+
+Imports autocalendar in fresh interpreters and fails (exit code 1) if the median import time
+exceeds the budget, or if modules that should only load on demand (Google client stack,
+pkg_resources) are imported by `import autocalendar`.
+
+    python benchmarks/import_time.py --budget 0.8 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must not be loaded by `import autocalendar`
+LAZY_MODULES = ["googleapiclient", "google_auth_oauthlib", "google.auth", "pkg_resources", "DateTime"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import autocalendar
+elapsed = time.perf_counter() - start
+loaded = [name for name in {lazy!r} if name in sys.modules]
+print(elapsed)
+print(','.join(loaded))
+"""
+
+
+def measure(repeat=5):
+    """Return the import times (in seconds) of `repeat` fresh interpreters and the lazy modules
+    that were loaded anyway.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    times = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", SCRIPT.format(lazy=LAZY_MODULES)],
+                                capture_output=True, text=True, check=True, env=env).stdout
+        lines = output.splitlines() + [""]
+        times.append(float(lines[0]))
+        loaded.update(filter(None, lines[1].split(",")))
+    return times, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum median import time (s).")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters.")
+    args = parser.parse_args(argv)
+
+    times, loaded = measure(args.repeat)
+    median = statistics.median(times)
+    print(f"import autocalendar: median {median * 1000:.1f} ms over {args.repeat} runs "
+          f"(budget {args.budget * 1000:.0f} ms)")
+
+    failed = False
+    if median > args.budget:
+        print("FAIL: import time exceeds budget.")
+        failed = True
+    if loaded:
+        print("FAIL: loaded eagerly: " + ", ".join(loaded))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite for autocalendar on synthetic workloads.
+
+Times `autoallocate` (both modes), `read_poll`, `preprocess_file`, `extract_info` and
+`add_event` (against an in-process fake Calendar service) and writes the results as JSON.
+With `--compare`, results are checked against a previous run and regressions are flagged
+(exit code 1).
+
+    python benchmarks/run.py --preset quick --output bench.json
+    python benchmarks/run.py --preset quick --output new.json --compare bench.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import autocalendar  # noqa: E402
+from fake_service import FakeService  # noqa: E402
+from workloads import make_matrix, make_participants, make_poll  # noqa: E402
+
+# (participants, slots) for allocation and number of participant rows for imports
+PRESETS = {
+    'quick': {'polls': [(10, 10), (100, 100), (1000, 100)],
+              'sheets': [10, 100, 1000]},
+    'full': {'polls': [(10, 10), (100, 100), (1000, 1000), (10000, 1000), (1000, 10000), (10000, 10000)],
+             'sheets': [10, 100, 1000, 10000]},
+}
+
+# Largest poll (in cells) written to a workbook to time `read_poll`
+MAX_POLL_CELLS = 1000000
+
+
+def timeit(function, repeat=3):
+    """Best wall time (in seconds) of `repeat` calls, with their printed output discarded so that
+    terminal I/O is not timed.
+    """
+    best = float('inf')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(preset='quick', repeat=3, workdir=None):
+    cases = {}
+    sizes = PRESETS[preset]
+    workdir = workdir or tempfile.mkdtemp(prefix='autocalendar-bench-')
+
+    for n_participants, n_slots in sizes['polls']:
+        size = f'{n_participants}x{n_slots}'
+        matrix = make_matrix(n_participants, n_slots, density=min(0.1, 20 / n_participants + 0.01))
+        for allocate_type in ('single', 'multiple'):
+            cases[f'autoallocate[{allocate_type}] {size}'] = timeit(
+                lambda: autocalendar.autoallocate(matrix, allocate_type=allocate_type, export_to=False,
+                                                  silent=True), repeat)
+
+        if n_participants * n_slots <= MAX_POLL_CELLS:
+            path = make_poll(os.path.join(workdir, f'poll_{size}.xlsx'), n_participants, n_slots)
+            cases[f'read_poll {size}'] = timeit(lambda: autocalendar.read_poll(path), repeat)
+
+    for n in sizes['sheets']:
+        path = make_participants(os.path.join(workdir, f'participants_{n}.xlsx'), n)
+        with contextlib.redirect_stdout(None):
+            participants = autocalendar.preprocess_file(path, header_row=2)
+        columns = dict(date_col='Date_Session1', time_col='Timeslot_Session1', location_col='Location_Session1')
+
+        cases[f'preprocess_file {n}'] = timeit(lambda: autocalendar.preprocess_file(path, header_row=2), repeat)
+        cases[f'preprocess_file[stream] {n}'] = timeit(
+            lambda: autocalendar.preprocess_file(path, header_row=2, usecols=['Participant Name', *columns.values()],
+                                                 filter_column='Calendar_Event', select='No'), repeat)
+        cases[f'extract_info {n}'] = timeit(lambda: autocalendar.extract_info(participants, **columns), repeat)
+
+        info = autocalendar.extract_info(participants, **columns)
+        for mode, options in (('sequential', {}), ('batch', {'batch_size': 50})):
+            cases[f'add_event[{mode}] {n}'] = timeit(
+                lambda: autocalendar.add_event(FakeService(), *info, creator_email='bench@example.com',
+                                               silent=True, **options), repeat)
+
+    return {'meta': {'preset': preset,
+                     'repeat': repeat,
+                     'python': platform.python_version(),
+                     'platform': platform.platform(),
+                     'autocalendar': autocalendar.__version__,
+                     'date': datetime.datetime.now().isoformat(timespec='seconds')},
+            'results': cases}
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Cases of `results` slower than in `baseline` by more than `tolerance` (a fraction), as
+    {case: (baseline seconds, new seconds)}.
+    """
+    regressions = {}
+    for case, seconds in results['results'].items():
+        before = baseline['results'].get(case)
+        if before is not None and seconds > before * (1 + tolerance):
+            regressions[case] = (before, seconds)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (best is kept).')
+    parser.add_argument('--output', default='bench_results.json', help='JSON file for the results.')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown before a case is flagged (0.2 = 20%%).')
+    args = parser.parse_args(argv)
+
+    results = run(args.preset, args.repeat)
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+    for case, seconds in results['results'].items():
+        print(f'{case:<45} {seconds * 1000:>10.2f} ms')
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for case, (before, after) in regressions.items():
+            print(f'REGRESSION {case}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
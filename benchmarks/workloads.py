@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Synthetic workloads in the layout of the files autocalendar reads.
+
+`make_poll()` writes a doodle poll export like `data/doodle_poll.xls` (title rows, then month,
+date and time header rows, one row of 'OK' cells per participant and a final 'Count' row).
+`make_participants()` writes a participant sheet like the one `data/example.py` consumes
+(a title row above the header row, i.e. `header_row=2`).
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from autocalendar import AvailabilityMatrix
+from autocalendar.availability import parse_slots
+
+# Daily slots of the synthetic polls
+SLOT_TIMES = ['08:00 – 11:30', '08:30 – 12:00', '11:30 – 15:00', '12:00 – 15:30', '15:00 – 18:30',
+              '15:30 – 19:00']
+
+TIMESLOTS = ['9.00am-10.00am', '10.00am-11.00am', '11.30am-12.30pm', '2.00pm-3.00pm', '3.30pm-4.30pm',
+             '5.00pm-6.00pm']
+
+
+def poll_headers(n_slots, start=datetime.date(2020, 11, 2)):
+    """Month, date and time header rows for `n_slots` slots, six per day."""
+    days = [start + datetime.timedelta(days=i // len(SLOT_TIMES)) for i in range(n_slots)]
+    months = [day.strftime('%B %Y') for day in days]
+    dates = [day.strftime('%a ') + str(day.day) for day in days]
+    times = [SLOT_TIMES[i % len(SLOT_TIMES)] for i in range(n_slots)]
+    return months, dates, times
+
+
+def make_availability(n_participants, n_slots, density=0.1, seed=0):
+    """Random boolean availability, with at least one slot per participant."""
+    rng = np.random.default_rng(seed)
+    available = rng.random((n_participants, n_slots)) < density
+    available[np.arange(n_participants), rng.integers(0, n_slots, n_participants)] = True
+    return available
+
+
+def make_matrix(n_participants, n_slots, density=0.1, seed=0):
+    """An `AvailabilityMatrix` built in memory (no workbook)."""
+    months, dates, times = poll_headers(n_slots)
+    participants = [f'Subject {i + 1}' for i in range(n_participants)]
+    return AvailabilityMatrix(participants, parse_slots(months, dates, times),
+                              make_availability(n_participants, n_slots, density, seed))
+
+
+def make_poll(path, n_participants, n_slots, density=0.1, seed=0):
+    """Write a synthetic doodle poll export to `path` ('.xlsx')."""
+    months, dates, times = poll_headers(n_slots)
+    available = make_availability(n_participants, n_slots, density, seed)
+
+    # Header cells are only filled where they change, as in doodle exports
+    months = [month if i == 0 or month != months[i - 1] else None for i, month in enumerate(months)]
+    dates = [date if i == 0 or date != dates[i - 1] else None for i, date in enumerate(dates)]
+
+    cells = np.where(available, 'OK', None).astype(object)
+    rows = [['Poll "Synthetic Experiment"'] + [None] * n_slots,
+            ['https://doodle.com/poll/'] + [None] * n_slots,
+            [None] * (n_slots + 1),
+            [None] + months,
+            [None] + dates,
+            [None] + times]
+    rows += [[f'Subject {i + 1}'] + list(cells[i]) for i in range(n_participants)]
+    rows += [['Count'] + available.sum(axis=0).tolist()]
+
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path
+
+
+def participants_frame(n, sessions=2, seed=0):
+    """Participant sheet with date, timeslot and location columns for each session."""
+    rng = np.random.default_rng(seed)
+    columns = {'Participant Name': [f'Subject{i + 1}' for i in range(n)]}
+    for session in range(1, sessions + 1):
+        offsets = rng.integers(0, 60, n) + 7 * (session - 1)
+        columns[f'Date_Session{session}'] = pd.Timestamp('2021-01-04') + pd.to_timedelta(offsets, unit='D')
+        columns[f'Timeslot_Session{session}'] = rng.choice(TIMESLOTS, n)
+        columns[f'Location_Session{session}'] = rng.choice(['B1-26', 'B1-27', 'MRI Suite'], n)
+    columns['Calendar_Event'] = rng.choice(['Yes', 'No'], n)
+    columns['Email'] = [f'subject{i + 1}@example.com' for i in range(n)]
+    columns['Notes'] = ''
+    return pd.DataFrame(columns)
+
+
+def make_participants(path, n, sessions=2, seed=0):
+    """Write a synthetic participant sheet (with a title row above the header) to `path`."""
+    frame = participants_frame(n, sessions, seed)
+    title = pd.DataFrame([['Participant schedules'] + [None] * (frame.shape[1] - 1)])
+    with pd.ExcelWriter(path) as writer:
+        title.to_excel(writer, header=False, index=False)
+        frame.to_excel(writer, index=False, startrow=1)
+    return path
@@ -18,6 +18,7 @@ def find_version():
 
 # Dependencies
 requirements = ["numpy", "pandas", "pickle-mixin", "google", "google_auth_oauthlib"]
+extra_requirements = {"matching": ["scipy"]}
 
 
 # Setup
@@ -41,12 +42,15 @@ setup(
     # Dependencies
     install_requires=requirements,
 #    setup_requires=setup_requirements,
-#    extras_require={"test": test_requirements},
+    extras_require=extra_requirements,
 #    test_suite="pytest",
 #    tests_require=test_requirements,
 
+    # Command line
+    entry_points={"console_scripts": ["autocalendar-allocate=autocalendar.cli:main"]},
+
     # Misc
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     include_package_data=True,
     zip_safe=False,
     classifiers=[
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Fixtures shared by the offline tests."""
+import datetime
+import json
+
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+
+import autocalendar
+
+
+# =============================================================================
+# Events
+# =============================================================================
+@pytest.fixture
+def make_event():
+    """Factory of one-hour events in 'B1-26', as created by `create_event()`."""
+    def make_event(date=datetime.date(2021, 1, 4), start=datetime.time(10), timezone='Asia/Singapore'):
+        end = datetime.time(start.hour + 1, start.minute)
+        return autocalendar.create_event('Experiment', '', date, start, end, 'B1-26', timezone, 'a@b.c')[0]
+    return make_event
+
+
+# =============================================================================
+# Google calendar responses
+# =============================================================================
+@pytest.fixture
+def make_service():
+    """Factory of calendar services answering requests with the given (headers, content) in order."""
+    def make_service(responses):
+        return build('calendar', 'v3', http=HttpMockSequence(responses), static_discovery=True)
+    return make_service
+
+
+@pytest.fixture
+def batch_response():
+    """Factory of responses to a batch request, with one (status, body) per call in order."""
+    def batch_response(*parts):
+        content = ''.join(f'--batch_boundary\nContent-Type: application/http\nContent-ID: <response-abc + {i}>\n\n'
+                          f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(body)}\n\n'
+                          for i, (status, body) in enumerate(parts))
+        return ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_boundary"'},
+                content + '--batch_boundary--')
+    return batch_response
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of randomized allocation."""
+import numpy as np
+import pytest
+
+import autocalendar
+from autocalendar import cli
+
+
+# =============================================================================
+# Restarts
+# =============================================================================
+@pytest.mark.parametrize('restarts', [0, -1])
+def test_best_allocation_rejects_no_restarts(restarts):
+    with pytest.raises(ValueError, match='restarts'):
+        autocalendar.best_allocation(np.ones((2, 2), dtype=bool), restarts=restarts)
+
+
+def test_cli_rejects_no_restarts(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path), '--restarts', '0'])
+    assert '--restarts must be at least 1' in capsys.readouterr().err
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of the local calendar backends."""
+import datetime
+
+import pandas as pd
+import pytest
+
+import autocalendar
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+@pytest.fixture
+def recurring(make_event):
+    """Weekly from 1 March 2021 (across the change to summer time), without 15 March."""
+    event = make_event(datetime.date(2021, 3, 1), timezone='Europe/London')
+    event['recurrence'] = autocalendar.recurrence_rule(7, 6, [datetime.date(2021, 3, 15)],
+                                                       start=datetime.datetime(2021, 3, 1, 10),
+                                                       timezone='Europe/London')
+    return event
+
+
+# =============================================================================
+# Recurring events
+# =============================================================================
+def test_occurrences(recurring):
+    starts = autocalendar.occurrences(recurring)['Start']
+    assert list(starts.dt.strftime('%d/%m %H:%M')) == ['01/03 10:00', '08/03 10:00', '22/03 10:00',
+                                                       '29/03 09:00', '05/04 09:00']
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'ics'])
+def test_busy_expands_recurring_events(backend, recurring, tmp_path):
+    if backend == 'sqlite':
+        backend = autocalendar.SQLiteBackend(str(tmp_path / 'plan.db'), timezone='Europe/London')
+    else:
+        backend = autocalendar.ICSBackend(str(tmp_path / 'plan.ics'), timezone='Europe/London')
+    assert backend.insert_many([recurring])[0]['error'] is None
+
+    busy = backend.busy(['primary'], pd.Timestamp('2021-03-01', tz='UTC'), pd.Timestamp('2021-04-10', tz='UTC'))
+    conflict, _ = busy.overlaps('primary', pd.to_datetime(['2021-03-29 09:30', '2021-03-15 10:30'], utc=True),
+                                pd.to_datetime(['2021-03-29 09:45', '2021-03-15 10:45'], utc=True))
+    assert list(conflict) == [True, False]  # a later occurrence, and the exception
+    assert len(backend.list('primary', pd.Timestamp('2021-03-29', tz='UTC'),
+                            pd.Timestamp('2021-03-30', tz='UTC'))) == 1
+
+
+def test_unbounded_recurrence_is_rejected(make_event, tmp_path):
+    backend = autocalendar.SQLiteBackend(str(tmp_path / 'plan.db'))
+    event = dict(make_event(datetime.date(2021, 3, 1), timezone='Europe/London'), recurrence=['RRULE:FREQ=WEEKLY'])
+    result = backend.insert_many([event])[0]
+
+    assert result['id'] is None
+    assert isinstance(result['error'], ValueError)
+    assert backend.list('primary') == []
+
+
+# =============================================================================
+# iCalendar export
+# =============================================================================
+def test_write_ics_defines_time_zones(recurring, make_event, tmp_path):
+    autocalendar.write_ics([recurring, make_event(datetime.date(2021, 5, 1))],
+                           tmp_path / 'plan.ics')
+    lines = (tmp_path / 'plan.ics').read_text().splitlines()
+
+    zones = [line.split(':', 1)[1] for line in lines if line.startswith('TZID:')]
+    assert sorted(zones) == ['Asia/Singapore', 'Europe/London']
+    assert 'EXDATE;TZID=Europe/London:20210315T100000' in lines
+    # The change to summer time during the series
+    start = lines.index('DTSTART:20210328T010000')
+    assert lines[start - 1] == 'BEGIN:DAYLIGHT' and lines[start + 2] == 'TZOFFSETTO:+0100'
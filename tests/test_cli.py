@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of the command line interface."""
+from autocalendar import cli
+
+
+# =============================================================================
+# Poll discovery
+# =============================================================================
+def test_find_polls_skips_exported_allocations(tmp_path):
+    for name in ['week1.xls', 'week2.xlsx', 'week1_allocations.xlsx', 'notes.txt']:
+        (tmp_path / name).touch()
+    (tmp_path / 'out').mkdir()
+    (tmp_path / 'out' / 'week3.xlsx').touch()
+
+    polls = cli.find_polls([str(tmp_path), str(tmp_path / '*' / '*.xlsx')], output_dir=str(tmp_path / 'out'))
+    assert polls == [str(tmp_path / 'week1.xls'), str(tmp_path / 'week2.xlsx')]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of conflict checks against free/busy responses from `HttpMockSequence`."""
+import datetime
+import json
+
+import pandas as pd
+import pytest
+
+import autocalendar
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+def _ok(body):
+    return {'status': '200'}, json.dumps(body)
+
+
+def _freebusy(calendars):
+    return _ok({'kind': 'calendar#freeBusy', 'calendars': calendars})
+
+
+# Busy over the first event (10:00-11:00 in Singapore)
+BUSY = {'busy': [{'start': '2021-01-04T02:00:00Z', 'end': '2021-01-04T03:00:00Z'}]}
+NOT_FOUND = {'busy': [], 'errors': [{'domain': 'global', 'reason': 'notFound'}]}
+
+
+# =============================================================================
+# Free/busy errors
+# =============================================================================
+def test_query_busy_collects_errors(make_service):
+    service = make_service([_freebusy({'primary': BUSY, 'room@group': NOT_FOUND})])
+    busy = autocalendar.query_busy(service, ['primary', 'room@group'],
+                                   pd.Timestamp('2021-01-04', tz='UTC'), pd.Timestamp('2021-01-05', tz='UTC'))
+
+    assert busy.errors == {'room@group': ['notFound']}
+    assert len(busy.busy('primary')) == 1
+
+
+def test_find_conflicts_raises_on_unreadable_calendar(make_event, make_service):
+    service = make_service([_freebusy({'room@group': NOT_FOUND})])
+    with pytest.raises(ValueError, match='room@group'):
+        autocalendar.find_conflicts(service, [make_event()], calendar_id='room@group')
+
+
+def test_add_event_does_not_reroute_to_unreadable_calendar(make_service):
+    service = make_service([_ok({'items': [{'id': 'room@group', 'summary': 'Room B'}]}),
+                        _freebusy({'primary': BUSY, 'room@group': NOT_FOUND})])
+    to_add = pd.DataFrame({'Participant Name': ['Subject1']})
+
+    results = autocalendar.add_event(service, [datetime.date(2021, 1, 4)], [datetime.time(10)],
+                                     [datetime.time(11)], ['B1-26'], to_add, 'a@b.c', silent=True,
+                                     name_col='Participant Name', batch_size=50, on_conflict='reroute',
+                                     reroute_to=['Room B'], resolver=autocalendar.CalendarResolver())
+
+    assert results == [{'id': None, 'error': 'conflict'}]  # skipped, not inserted into Room B
+
+
+# =============================================================================
+# Skipped events
+# =============================================================================
+def test_add_event_returns_one_result_per_row(make_service):
+    service = make_service([_freebusy({'primary': BUSY}),
+                        _ok({'id': 'e1'})])  # a single event is not sent as a batch
+    to_add = pd.DataFrame({'Participant Name': ['Subject1', 'Subject2']})
+
+    results = autocalendar.add_event(service, [datetime.date(2021, 1, 4)] * 2, [datetime.time(10), datetime.time(11)],
+                                     [datetime.time(11), datetime.time(12)], ['B1-26'] * 2, to_add, 'a@b.c',
+                                     silent=True, name_col='Participant Name', batch_size=50, on_conflict='skip')
+
+    assert [result['id'] for result in results] == [None, 'e1']
+    assert [result['error'] for result in results] == ['conflict', None]
+
+
+def test_add_event_reroute_without_events(make_service):
+    to_add = pd.DataFrame({'Participant Name': []})
+    results = autocalendar.add_event(make_service([]), [], [], [], [], to_add, 'a@b.c', silent=True,
+                                     name_col='Participant Name', batch_size=50, on_conflict='reroute',
+                                     reroute_to=['Room B'], resolver=autocalendar.CalendarResolver())
+    assert results == []
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of the write-back of added events to participant sheets."""
+import pandas as pd
+import pytest
+
+import autocalendar
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+@pytest.fixture
+def sessions():
+    """One row per session, participant 'A' having three sessions."""
+    return pd.DataFrame({'Participant Name': ['A', 'A', 'A', 'B'],
+                         'Date_Session': ['01/03/21', '08/03/21', '15/03/21', '15/03/21'],
+                         'Calendar_Event': ['No', 'No', 'No', 'Yes']})
+
+
+def _write(frame, path):
+    if path.suffix == '.csv':
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_excel(path, index=False)
+    return path
+
+
+# =============================================================================
+# Write-back by sheet row
+# =============================================================================
+@pytest.mark.parametrize('extension', ['.csv', '.xlsx'])
+def test_preprocess_file_indexes_sheet_rows(sessions, tmp_path, extension):
+    path = _write(sessions, tmp_path / ('participants' + extension))
+    participants = autocalendar.preprocess_file(path, usecols=['Participant Name', 'Date_Session'],
+                                                filter_column='Calendar_Event', select='No')
+    assert participants.index.name == 'Row'
+    assert list(participants.index) == [2, 3, 4]
+
+
+def test_preprocess_file_indexes_sheet_rows_below_title(sessions, tmp_path):
+    path = tmp_path / 'participants.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([['Participant schedules']]).to_excel(writer, header=False, index=False)
+        sessions.to_excel(writer, index=False, startrow=1)
+
+    participants = autocalendar.preprocess_file(path, header_row=2)
+    assert list(participants.index) == [3, 4, 5, 6]
+    assert participants.loc[4, 'Date_Session'] == '08/03/21'
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.xlsx'])
+def test_write_status_by_row(sessions, tmp_path, extension):
+    path = _write(sessions, tmp_path / ('participants' + extension))
+    # The session in row 3 was not added
+    updated = autocalendar.write_status(path, ['A', 'A'], ['e1', 'e3'], rows=[2, 4])
+
+    sheet = pd.read_csv(path) if extension == '.csv' else pd.read_excel(path)
+    assert updated == 2
+    assert sheet['Calendar_Event'].tolist() == ['Yes', 'No', 'Yes', 'Yes']
+    assert sheet['Calendar_Event_ID'].fillna('').tolist() == ['e1', '', 'e3', '']
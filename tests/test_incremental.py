@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of incremental re-allocation."""
+import numpy as np
+import pytest
+
+import autocalendar
+from autocalendar.availability import parse_slots
+from autocalendar.matching import match_slots
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+TIMES = ['09:00 – 10:00', '10:00 – 11:00', '11:00 – 12:00']
+
+
+def _matrix(participants, available):
+    slots = parse_slots(['November 2020'] * len(TIMES), ['Tue 3'] * len(TIMES), TIMES)
+    return autocalendar.AvailabilityMatrix(participants, slots, available)
+
+
+def _changes(changes):
+    return {row['Participant']: (row['Change'], row['Timeslots'], row['Previous Timeslots'])
+            for _, row in changes.iterrows()}
+
+
+# =============================================================================
+# Updates
+# =============================================================================
+def test_newcomer_takes_free_slot():
+    allocation = autocalendar.IncrementalAllocation(_matrix(['A'], [[1, 0, 0]]), [0, -1, -1])
+    changes = allocation.update(_matrix(['A', 'B'], [[1, 0, 0], [0, 1, 0]]))
+
+    assert _changes(changes) == {'B': ('new', TIMES[1], '')}
+    assert allocation.assigned.tolist() == [0, 1, -1]
+
+
+@pytest.mark.parametrize('move', [True, False])
+def test_newcomer_moves_booked_participant(move):
+    allocation = autocalendar.IncrementalAllocation(_matrix(['A'], [[1, 1, 0]]), [0, -1, -1])
+    changes = allocation.update(_matrix(['A', 'B'], [[1, 1, 0], [1, 0, 0]]), move=move)
+
+    if move:  # A moves one slot over to make room for B
+        assert _changes(changes) == {'A': ('moved', TIMES[1], TIMES[0]), 'B': ('new', TIMES[0], '')}
+        assert allocation.assigned.tolist() == [1, 0, -1]
+    else:
+        assert changes.empty
+        assert allocation.assigned.tolist() == [0, -1, -1]
+
+
+def test_participant_loses_slot():
+    allocation = autocalendar.IncrementalAllocation(_matrix(['A', 'B'], [[1, 0, 0], [0, 1, 0]]), [0, 1, -1])
+    changes = allocation.update(_matrix(['A', 'B'], [[0, 0, 0], [0, 1, 0]]))
+
+    assert _changes(changes) == {'A': ('unassigned', '', TIMES[0])}
+    assert allocation.assigned.tolist() == [-1, 1, -1]
+
+
+def test_participant_removed_from_poll():
+    allocation = autocalendar.IncrementalAllocation(_matrix(['A', 'B'], [[1, 0, 0], [0, 1, 0]]), [0, 1, -1])
+    changes = allocation.update(_matrix(['B'], [[0, 1, 0]]))
+
+    assert _changes(changes) == {'A': ('removed', '', TIMES[0])}
+    assert allocation.assigned.tolist() == [-1, 0, -1]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_update_is_maximum_matching(seed):
+    rng = np.random.default_rng(seed)
+    available = rng.random((8, 3)) < 0.4
+    participants = [f'Subject {i + 1}' for i in range(8)]
+    allocation = autocalendar.IncrementalAllocation.from_poll(_matrix(participants[:4], available[:4]))
+
+    # Newcomers answer, and some earlier participants change their availability
+    available[:4] ^= rng.random((4, 3)) < 0.2
+    allocation.update(_matrix(participants, available))
+
+    booked = allocation.assigned[allocation.assigned >= 0]
+    assert len(np.unique(booked)) == len(booked)
+    assert available[booked, np.flatnonzero(allocation.assigned >= 0)].all()
+    assert len(booked) == (match_slots(available) >= 0).sum()
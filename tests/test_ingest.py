@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of participant sheet ingest."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import autocalendar
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+@pytest.fixture
+def participants():
+    return pd.DataFrame({'Participant Name': ['Subject1', 'Subject2', 'Subject3'],
+                         'Date_Session1': pd.to_datetime(['2021-01-04', '2021-01-13', '2021-02-01']),
+                         'Timeslot_Session1': ['9.00am-10.00am', '2.00pm-3.00pm', '11.30am-12.30pm'],
+                         'Location_Session1': ['B1-26', 'B1-27', 'MRI Suite'],
+                         'Calendar_Event': ['No', 'Yes', 'No']})
+
+
+def _extract(file):
+    participants = autocalendar.preprocess_file(
+        file, usecols=['Participant Name', 'Date_Session1', 'Timeslot_Session1', 'Location_Session1'],
+        filter_column='Calendar_Event', select='No')
+    return autocalendar.extract_info(participants, date_col='Date_Session1', time_col='Timeslot_Session1',
+                                     location_col='Location_Session1')
+
+
+# =============================================================================
+# CSV and excel sheets
+# =============================================================================
+def test_csv_and_xlsx_extract_the_same(participants, tmp_path):
+    participants.to_excel(tmp_path / 'participants.xlsx', index=False)
+    # Dates in CSV files are text, in 'DD/MM/YY' format
+    participants.assign(Date_Session1=participants['Date_Session1'].dt.strftime('%d/%m/%y')).to_csv(
+        tmp_path / 'participants.csv', index=False)
+
+    from_xlsx = _extract(tmp_path / 'participants.xlsx')
+    from_csv = _extract(tmp_path / 'participants.csv')
+
+    for xlsx, csv in zip(from_xlsx[:-1], from_csv[:-1]):
+        np.testing.assert_array_equal(xlsx, csv)
+    pd.testing.assert_frame_equal(from_xlsx[-1], from_csv[-1])
+    assert list(from_csv[0]) == [datetime.datetime(2021, 1, 4), datetime.datetime(2021, 2, 1)]
+
+
+def test_csv_dates_create_events(participants, tmp_path):
+    participants.assign(Date_Session1=participants['Date_Session1'].dt.strftime('%d/%m/%y')).to_csv(
+        tmp_path / 'participants.csv', index=False)
+    dates, start_points, end_points, locations, _ = _extract(tmp_path / 'participants.csv')
+
+    event, _ = autocalendar.create_event('Experiment', '', dates[0], start_points[0], end_points[0],
+                                         locations[0], 'Asia/Singapore', 'a@b.c')
+    assert event['start']['dateTime'] == '2021-01-04T09:00:00'
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of maximum bipartite matching of participants to slots."""
+import numpy as np
+import pytest
+
+from autocalendar.matching import hopcroft_karp, match_slots
+
+pytest.importorskip('scipy')  # optional dependency, the reference for the fallback
+from scipy.sparse import csr_matrix  # noqa: E402
+from scipy.sparse.csgraph import maximum_bipartite_matching  # noqa: E402
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+def _assert_valid(available, assigned):
+    booked = assigned[assigned >= 0]
+    assert assigned.shape == (available.shape[1],)
+    assert len(np.unique(booked)) == len(booked)  # at most one slot per participant
+    assert available[booked, np.flatnonzero(assigned >= 0)].all()
+
+
+# =============================================================================
+# Cardinality
+# =============================================================================
+@pytest.mark.parametrize('shape', [(0, 5), (5, 0), (10, 10), (30, 8), (8, 30), (60, 60)])
+@pytest.mark.parametrize('density', [0.05, 0.2, 0.6])
+def test_hopcroft_karp_matches_scipy(shape, density):
+    rng = np.random.default_rng(sum(shape) + int(density * 100))
+    for _ in range(5):
+        available = rng.random(shape) < density
+        assigned = hopcroft_karp(available)
+        expected = maximum_bipartite_matching(csr_matrix(available), perm_type='row')
+
+        _assert_valid(available, assigned)
+        assert (assigned >= 0).sum() == (expected >= 0).sum()
+
+
+# =============================================================================
+# Costs
+# =============================================================================
+@pytest.mark.parametrize('costs, expected', [([[0, 1], [1, 0]], [0, 1]),
+                                             ([[1, 0], [0, 1]], [1, 0])])
+def test_costs_pick_cheaper_maximum_matching(costs, expected):
+    assigned = match_slots(np.ones((2, 2), dtype=bool), costs=np.array(costs))
+    assert assigned.tolist() == expected
+
+
+def test_costs_do_not_reduce_cardinality():
+    # Subject 0 prefers slot 0, but only takes slot 1 so that subject 1 gets a slot too
+    available = np.array([[True, True], [True, False]])
+    assigned = match_slots(available, costs=np.array([[0, 10], [5, 0]]))
+    assert assigned.tolist() == [1, 0]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of recurring series."""
+import datetime
+
+import pandas as pd
+
+import autocalendar
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+def _dates(*days):
+    return [datetime.date(2021, 1, 4) + datetime.timedelta(days=day) for day in days]
+
+
+# Weekly on Mondays from 4 January, without 18 January, plus Wednesday 13 January
+WEEKLY = _dates(0, 7, 21, 28)
+OFF_GRID = _dates(9)
+
+
+# =============================================================================
+# Series
+# =============================================================================
+def test_find_series_with_missed_week():
+    start, interval, count, exceptions, others = autocalendar.find_series(WEEKLY + OFF_GRID)
+
+    assert (start, interval, count) == (WEEKLY[0], 7, 5)
+    assert exceptions == _dates(14)
+    assert others == OFF_GRID
+
+
+def test_find_series_mostly_gaps():
+    assert autocalendar.find_series(_dates(0, 7, 35)) is None
+    assert autocalendar.find_series(_dates(0)) is None
+
+
+def test_collapse_series(make_event):
+    events, calendar_id, covered = autocalendar.collapse_series([make_event(date) for date in WEEKLY + OFF_GRID])
+
+    assert calendar_id == 'primary'
+    assert len(events) == 2
+    assert events[0]['recurrence'] == ['RRULE:FREQ=WEEKLY;COUNT=5',
+                                       'EXDATE;TZID=Asia/Singapore:20210118T100000']
+    assert 'recurrence' not in events[1]  # the off-grid session stays separate
+    assert events[1]['start']['dateTime'] == '2021-01-13T10:00:00'
+    assert covered == [0, 0, 0, 0, 1]
+
+
+def test_collapse_series_by_key_and_time(make_event):
+    keys = ['Subject1'] * 2 + ['Subject2'] * 2 + ['Subject1']
+    events = [make_event(date) for date in _dates(0, 7, 0, 7)] + [make_event(_dates(14)[0], datetime.time(14))]
+    events, _, covered = autocalendar.collapse_series(events, keys=keys)
+
+    assert [len(event.get('recurrence', [])) for event in events] == [1, 1, 0]
+    assert covered == [0, 0, 1, 1, 2]
+
+
+# =============================================================================
+# Adding recurring events
+# =============================================================================
+def test_add_event_recurring_results_per_row(tmp_path):
+    backend = autocalendar.SQLiteBackend(str(tmp_path / 'plan.db'), timezone='Asia/Singapore')
+    dates = WEEKLY + OFF_GRID
+    to_add = pd.DataFrame({'Participant Name': ['Subject1'] * len(dates)})
+
+    results = autocalendar.add_event(backend, [pd.Timestamp(date) for date in dates],
+                                     [datetime.time(10)] * len(dates), [datetime.time(11)] * len(dates),
+                                     ['B1-26'] * len(dates), to_add, 'a@b.c', silent=True,
+                                     name_col='Participant Name', recurring=True)
+
+    ids = [result['id'] for result in results]
+    assert len(results) == len(dates)
+    assert all(result['error'] is None for result in results)
+    assert len(set(ids[:4])) == 1 and ids[4] != ids[0]  # the series, then the off-grid session
+    assert len(backend.list('primary')) == 2
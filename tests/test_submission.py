@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of batched and concurrent event submission against `HttpMockSequence`."""
+import json
+import time
+
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+import autocalendar
+from autocalendar import submission
+
+
+# =============================================================================
+# Utilities
+# =============================================================================
+def _error(status, reason, headers=None):
+    body = {'error': {'code': status, 'message': reason, 'errors': [{'reason': reason}]}}
+    return dict({'status': str(status)}, **(headers or {})), json.dumps(body)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    slept = []
+    monkeypatch.setattr(submission.time, 'sleep', slept.append)
+    return slept
+
+
+# =============================================================================
+# Batched insertion
+# =============================================================================
+def test_insert_events_mixed_batch(make_event, make_service, batch_response):
+    service = make_service([batch_response(('200 OK', {'id': 'e0'}),
+                                           ('400 Bad Request', {'error': {'code': 400, 'message': 'bad'}}),
+                                           ('200 OK', {'id': 'e2'}))])
+    results = autocalendar.insert_events(service, [make_event() for _ in range(3)], batch_size=50)
+
+    assert [result['id'] for result in results] == ['e0', None, 'e2']
+    assert results[0]['error'] is None and results[2]['error'] is None
+    assert isinstance(results[1]['error'], HttpError)
+    assert results[1]['error'].resp.status == 400
+
+
+def test_insert_events_whole_batch_failure(make_event):
+    class FailingHttp(httplib2.Http):
+        def request(self, *args, **kwargs):
+            raise ConnectionError('connection reset')
+
+    service = build('calendar', 'v3', http=FailingHttp(), static_discovery=True)
+    results = autocalendar.insert_events(service, [make_event() for _ in range(2)], batch_size=2)
+
+    assert all(result['id'] is None for result in results)
+    assert all(isinstance(result['error'], ConnectionError) for result in results)
+
+
+# =============================================================================
+# Concurrent submission with retries
+# =============================================================================
+def test_submit_events_retries_429(no_sleep, make_event, make_service):
+    http = HttpMockSequence([_error(429, 'rateLimitExceeded', {'retry-after': '3'}),
+                             ({'status': '200'}, json.dumps({'id': 'e0'}))])
+    service = make_service([])
+    results = autocalendar.submit_events(service, [make_event()], workers=1, qps=1000,
+                                         http_factory=lambda service: http)
+
+    assert results == [{'id': 'e0', 'error': None, 'retries': 1}]
+    assert no_sleep and no_sleep[0] >= 3  # Retry-After is honoured
+
+
+def test_submit_events_does_not_retry_forbidden(no_sleep, make_event, make_service):
+    http = HttpMockSequence([_error(403, 'forbidden')])
+    service = make_service([])
+    results = autocalendar.submit_events(service, [make_event()], workers=1, qps=1000,
+                                         http_factory=lambda service: http)
+
+    assert results[0]['id'] is None
+    assert results[0]['retries'] == 0
+    assert results[0]['error'].resp.status == 403
+    assert not no_sleep
+
+
+def test_submit_events_retry_conflict_is_success(no_sleep, make_event, make_service):
+    # The first insert reached the server but its response was lost
+    http = HttpMockSequence([_error(503, 'backendError'), _error(409, 'duplicate')])
+    service = make_service([])
+    results = autocalendar.submit_events(service, [make_event()], workers=1, qps=1000,
+                                         http_factory=lambda service: http)
+
+    assert results[0]['error'] is None
+    assert results[0]['retries'] == 1
+    assert results[0]['id']  # the client-side ID sent with both attempts
+
+
+def test_submit_events_first_conflict_is_error(no_sleep, make_event, make_service):
+    http = HttpMockSequence([_error(409, 'duplicate')])
+    service = make_service([])
+    events = [dict(make_event(), id='taken')]
+    results = autocalendar.submit_events(service, events, workers=1, qps=1000,
+                                         http_factory=lambda service: http)
+
+    assert results[0]['id'] is None
+    assert results[0]['error'].resp.status == 409
+
+
+def test_is_retryable():
+    def http_error(status, reason):
+        headers, content = _error(status, reason)
+        return HttpError(httplib2.Response(headers), content.encode())
+
+    assert autocalendar.submission.is_retryable(http_error(403, 'rateLimitExceeded'))
+    assert autocalendar.submission.is_retryable(http_error(403, 'userRateLimitExceeded'))
+    assert not autocalendar.submission.is_retryable(http_error(403, 'forbidden'))
+    assert autocalendar.submission.is_retryable(http_error(503, 'backendError'))
+    assert not autocalendar.submission.is_retryable(http_error(404, 'notFound'))
+    assert autocalendar.submission.is_retryable(ConnectionError())
+
+
+def test_backoff_honours_retry_after():
+    assert autocalendar.submission.backoff(0, retry_after=5) >= 5
+    assert 0 <= autocalendar.submission.backoff(3, base=0.5, cap=2) <= 2
+
+
+def test_token_bucket_pacing():
+    bucket = autocalendar.TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9  # the first call uses the initial token
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Offline tests of incremental sync against `HttpMockSequence`."""
+import json
+
+import autocalendar
+
+
+# =============================================================================
+# Batched sync
+# =============================================================================
+def test_sync_events_batches_calls(tmp_path, make_event, make_service, batch_response):
+    keys = ['Subject1', 'Subject2', 'Subject3']
+    ids = [autocalendar.event_id(key, 'Session 1') for key in keys]
+    service = make_service([
+        # One batch of inserts: Subject2 is already in the calendar, Subject3 is rejected
+        batch_response(('200 OK', {'id': ids[0]}),
+                       ('409 Conflict', {'error': {'code': 409, 'message': 'duplicate'}}),
+                       ('400 Bad Request', {'error': {'code': 400, 'message': 'bad'}})),
+        ({'status': '200'}, json.dumps({'id': ids[1]})),  # update of Subject2
+    ])
+    events = [make_event() for _ in range(3)]
+
+    with autocalendar.SyncLedger(str(tmp_path / 'sync.db')) as ledger:
+        summary = autocalendar.sync_events(service, events, keys, ledger, session='Session 1')
+        entries = ledger.entries('primary', 'Session 1')
+
+    assert summary == {'inserted': 2, 'patched': 0, 'deleted': 0, 'unchanged': 0, 'failed': 1}
+    assert sorted(entries) == ['Subject1', 'Subject2']  # Subject3 is inserted by the next sync